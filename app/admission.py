@@ -0,0 +1,93 @@
+import math
+import time
+from collections import OrderedDict
+import orjson
+from app import config, metrics
+
+# Admission control in front of the data and tool routes. A request is
+# refused before any work is done, with a Retry-After header, when its client
+# has used up its token bucket (429: CLIENT_RATE requests per second, bursts
+# of CLIENT_BURST) or when MAX_INFLIGHT_REQUESTS admitted requests are
+# already in progress (503). Health, metrics and the HTML pages are exempt.
+
+PREFIXES = ("/resource/", "/tool/", "/mcp")
+# Buckets are kept for at most this many clients, least recently seen
+# dropped first; a dropped client starts again with a full bucket.
+MAX_CLIENTS = 10000
+
+
+class TokenBuckets:
+    def __init__(self, rate, burst, max_clients=MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+
+    def take(self, client):
+        # Returns 0 if a token was taken, else the seconds until one is due.
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionMiddleware:
+    # Plain ASGI, like MetricsMiddleware, which sits outside it and so also
+    # records the refusals.
+    def __init__(self, app):
+        self.app = app
+        self.buckets = TokenBuckets(config.CLIENT_RATE, config.CLIENT_BURST) if config.CLIENT_RATE > 0 else None
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        if self.buckets is not None:
+            wait = self.buckets.take(_client(scope))
+            if wait:
+                await _refuse(send, 429, "rate_limited", math.ceil(wait))
+                return
+        if self.in_flight >= config.MAX_INFLIGHT_REQUESTS:
+            await _refuse(send, 503, "overloaded", 1)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+
+def _client(scope):
+    if config.CLIENT_ID_HEADER:
+        name = config.CLIENT_ID_HEADER.encode()
+        for key, value in scope["headers"]:
+            if key == name:
+                return value.decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else ""
+
+
+async def _refuse(send, status, reason, retry_after):
+    metrics.ADMISSION_REJECTED.labels(reason).inc()
+    body = orjson.dumps({"error": reason, "retry_after": retry_after})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -2,9 +2,14 @@
 import streamlit as st
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Configuration
 API_BASE = "http://127.0.0.1:8000"
+DATA_TTL = 600
+IMAGE_TTL = 24 * 3600
+ARTWORK_URL = "https://img.pokemondb.net/artwork/{}.jpg"
 
 st.set_page_config(
     page_title="Pokémon Battle Simulator",
@@ -28,14 +33,6 @@ st.markdown("""
         margin: 10px;
         box-shadow: 0 4px 8px rgba(0,0,0,0.2);
     }
-    .battle-log {
-        height: 400px;
-        overflow-y: auto;
-        background-color: #f0f2f6;
-        padding: 15px;
-        border-radius: 10px;
-        margin-top: 20px;
-    }
     .type-badge {
         display: inline-block;
         padding: 3px 10px;
@@ -55,26 +52,64 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Helper functions
-def get_pokemon_data(name):
+@st.cache_resource
+def get_session():
+    # One pooled session per server process, shared by every rerun and user.
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def _fetch_pokemon_data(name, fields=None):
+    # Raises on failure so errors are not cached; only real answers are.
+    params = {"name": name} if fields is None else {"name": name, "fields": fields}
+    response = get_session().get(f"{API_BASE}/resource/pokemon", params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+def get_pokemon_data(name, fields=None):
     try:
-        response = requests.get(f"{API_BASE}/resource/pokemon?name={name}")
-        if response.status_code == 200:
-            return response.json()
-        return {"error": f"HTTP Error: {response.status_code}"}
+        return _fetch_pokemon_data(name, fields)
+    except requests.exceptions.HTTPError as e:
+        return {"error": f"HTTP Error: {e.response.status_code}"}
     except requests.exceptions.RequestException as e:
         return {"error": f"Connection error: {str(e)}"}
 
-def simulate_battle(pokemon1, pokemon2):
+@st.cache_data(ttl=IMAGE_TTL, show_spinner=False)
+def _fetch_artwork(name):
+    response = get_session().get(ARTWORK_URL.format(name), timeout=10)
+    response.raise_for_status()
+    return response.content
+
+def get_artwork(name):
+    # Image bytes, or None if the artwork can't be fetched.
+    try:
+        return _fetch_artwork(name)
+    except requests.exceptions.RequestException:
+        return None
+
+def stream_battle(pokemon1, pokemon2):
+    # Yields each turn event as the server plays it, then the final result.
     try:
-        # Fixed: Use query parameters instead of form data
-        response = requests.post(
-            f"{API_BASE}/tool/simulate_battle?pokemon_1={pokemon1}&pokemon_2={pokemon2}"
-        )
-        if response.status_code == 200:
-            return response.json()
-        return {"error": f"HTTP Error: {response.status_code} - {response.text}"}
+        with get_session().post(
+            f"{API_BASE}/tool/simulate_battle/stream",
+            params={"pokemon_1": pokemon1, "pokemon_2": pokemon2},
+            stream=True,
+        ) as response:
+            if response.status_code != 200:
+                yield {"error": f"HTTP Error: {response.status_code} - {response.text}"}
+                return
+            if response.headers.get("content-type", "").startswith("application/json"):
+                yield response.json()
+                return
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
     except requests.exceptions.RequestException as e:
-        return {"error": f"Connection error: {str(e)}"}
+        yield {"error": f"Connection error: {str(e)}"}
 
 # Type color mapping
 type_colors = {
@@ -106,7 +141,7 @@ with st.expander("Debug Info", expanded=False):
     st.write("API Base URL:", API_BASE)
     if st.button("Test API Connection"):
         try:
-            test_response = requests.get(f"{API_BASE}/resource/pokemon?name=pikachu")
+            test_response = get_session().get(f"{API_BASE}/resource/pokemon?name=pikachu", timeout=10)
             st.write("Test Response Status:", test_response.status_code)
             st.write("Test Response Text:", test_response.text)
         except Exception as e:
@@ -129,10 +164,10 @@ if page == "Pokémon Data":
                 
                 with col1:
                     # Display Pokémon image
-                    try:
-                        st.image(f"https://img.pokemondb.net/artwork/{pokemon_name}.jpg", 
-                                 caption=data['name'].title(), width=200)
-                    except:
+                    artwork = get_artwork(pokemon_name)
+                    if artwork:
+                        st.image(artwork, caption=data['name'].title(), width=200)
+                    else:
                         st.info("Image not available")
                 
                 with col2:
@@ -180,6 +215,8 @@ if page == "Pokémon Data":
             else:
                 error_msg = data.get('error', 'Unknown error') if data else 'No data returned'
                 st.error(f"Error fetching Pokémon data: {error_msg}")
+                if data and data.get('suggestions'):
+                    st.info("Did you mean: " + ", ".join(s.title() for s in data['suggestions']) + "?")
 
 else:  # Battle Simulator page
     st.header("Pokémon Battle Simulator")
@@ -190,13 +227,11 @@ else:  # Battle Simulator page
         pokemon1 = st.text_input("First Pokémon:", "pikachu").lower().strip()
         data1 = None
         if pokemon1:
-            data1 = get_pokemon_data(pokemon1)
+            data1 = get_pokemon_data(pokemon1, "types,stats")
             if data1 and "error" not in data1:
-                try:
-                    st.image(f"https://img.pokemondb.net/artwork/{pokemon1}.jpg", 
-                             caption=data1.get('name', pokemon1).title(), width=150)
-                except:
-                    pass
+                artwork = get_artwork(pokemon1)
+                if artwork:
+                    st.image(artwork, caption=data1.get('name', pokemon1).title(), width=150)
                 
                 # Display types with colored badges
                 if 'types' in data1:
@@ -222,13 +257,11 @@ else:  # Battle Simulator page
         pokemon2 = st.text_input("Second Pokémon:", "charmander").lower().strip()
         data2 = None
         if pokemon2:
-            data2 = get_pokemon_data(pokemon2)
+            data2 = get_pokemon_data(pokemon2, "types,stats")
             if data2 and "error" not in data2:
-                try:
-                    st.image(f"https://img.pokemondb.net/artwork/{pokemon2}.jpg", 
-                             caption=data2.get('name', pokemon2).title(), width=150)
-                except:
-                    pass
+                artwork = get_artwork(pokemon2)
+                if artwork:
+                    st.image(artwork, caption=data2.get('name', pokemon2).title(), width=150)
                 
                 # Display types with colored badges
                 if 'types' in data2:
@@ -251,39 +284,50 @@ else:  # Battle Simulator page
         if not pokemon1 or not pokemon2:
             st.error("Please enter both Pokémon names!")
         else:
+            st.subheader("Battle Log")
+            # A scrollable box that gets one element per turn, so each turn
+            # sends only its own line instead of re-rendering the whole log
+            log_box = st.container(height=400)
+            log_entries = 0
+            battle_result = None
+
+            # Render turns as they stream in
             with st.spinner("Simulating battle..."):
-                battle_result = simulate_battle(pokemon1, pokemon2)
-                
-                if battle_result and "error" not in battle_result:
-                    # Display winner
-                    st.success(f"🎉 Winner: {battle_result.get('winner', 'Unknown').title()}!")
-                    
-                    # Display battle log
-                    st.subheader("Battle Log")
-                    if 'battle_log' in battle_result and battle_result['battle_log']:
-                        log_html = "<div class='battle-log'>"
-                        for log_entry in battle_result['battle_log']:
-                            log_html += f"<div class='log-entry'>{log_entry}</div>"
-                        log_html += "</div>"
-                        st.markdown(log_html, unsafe_allow_html=True)
+                for event in stream_battle(pokemon1, pokemon2):
+                    if "message" in event:
+                        log_box.markdown(f"<div class='log-entry'>{event['message']}</div>", unsafe_allow_html=True)
+                        log_entries += 1
                     else:
-                        st.info("No battle log available.")
-                    
-                    # Display status effects
-                    if 'status_effects' in battle_result and battle_result['status_effects']:
-                        st.subheader("Status Effects")
-                        for pokemon, status in battle_result['status_effects'].items():
-                            if status:
-                                st.write(f"{pokemon.title()}: {status.title()}")
+                        battle_result = event
+
+            if battle_result and "error" not in battle_result:
+                if not log_entries:
+                    log_box.info("No battle log available.")
+
+                # Results are keyed by slot, so mirror matches label each side
+                slot_labels = {"pokemon_1": f"{pokemon1.title()} (Pokémon 1)", "pokemon_2": f"{pokemon2.title()} (Pokémon 2)"}
+
+                # Display winner
+                if battle_result.get('winner_slot'):
+                    st.success(f"🎉 Winner: {slot_labels[battle_result['winner_slot']]}!")
                 else:
-                    error_msg = battle_result.get('error', 'Unknown error') if battle_result else 'No response from server'
-                    st.error(f"Error simulating battle: {error_msg}")
-                    
-                    # Debug information
-                    with st.expander("Debug Details"):
-                        st.write("Pokémon 1:", pokemon1)
-                        st.write("Pokémon 2:", pokemon2)
-                        st.write("Full error response:", battle_result)
+                    st.info("The battle ended in a draw.")
+
+                # Display status effects
+                if 'status_effects' in battle_result and battle_result['status_effects']:
+                    st.subheader("Status Effects")
+                    for slot, status in battle_result['status_effects'].items():
+                        if status:
+                            st.write(f"{slot_labels[slot]}: {status.title()}")
+            else:
+                error_msg = battle_result.get('error', 'Unknown error') if battle_result else 'No response from server'
+                st.error(f"Error simulating battle: {error_msg}")
+
+                # Debug information
+                with st.expander("Debug Details"):
+                    st.write("Pokémon 1:", pokemon1)
+                    st.write("Pokémon 2:", pokemon2)
+                    st.write("Full error response:", battle_result)
 
 # Footer
 st.markdown("---")
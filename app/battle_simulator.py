@@ -1,73 +1,244 @@
+import asyncio
+import json
 import random
-import requests
-from app.utils import get_type_multiplier
+import time
+from functools import lru_cache
+from app import metrics, name_index, profiling
+from app.models import Pokemon
+from app.pokeapi import fetch_attacks, fetch_pokemon
+from app.type_chart import type_multiplier
 
 STATUS_EFFECTS = ['paralysis', 'burn', 'poison']
+# Status codes; 0 means no status, otherwise STATUS_EFFECTS[code - 1].
+PARALYSIS, BURN, POISON = 1, 2, 3
+
+# Battles record turns as (turn, actor, action, value, hp, move) tuples.
+# actor is the slot (0 = pokemon_1, 1 = pokemon_2) the event happens to or
+# is done by; value is the damage dealt, or the status code for STATUS; hp
+# is the HP of the Pokémon that took damage or gained the status, afterwards;
+# move is the move used for ATTACK and MISSED, None otherwise or when no move
+# data is available.
+ATTACK, PARALYZED, POISONED, STATUS, MISSED = range(5)
+
+# Same-type attack bonus, for moves that share a type with their user.
+STAB = 1.5
+
+# Safety cap for matchups where neither side can deal damage; a battle that
+# reaches it is a draw (winner None).
+MAX_ROUNDS = 500
+
+async def load_combatant(p):
+    # p may be a name or an already loaded Pokemon entity; None if the name
+    # is unknown. The learnset is resolved against the move catalog here so
+    # battles can run synchronously.
+    if not isinstance(p, Pokemon):
+        name, _ = await name_index.resolve(p)
+        if name is None:
+            return None
+        p = await fetch_pokemon(name)
+    if p is not None:
+        await fetch_attacks(p)
+    return p
+
+async def fetch_combatants(pokemon_1, pokemon_2):
+    return await asyncio.gather(load_combatant(pokemon_1), load_combatant(pokemon_2))
+
+async def invalid_names(*names):
+    # The error for a failed fetch_combatants, with suggestions for any name
+    # the name index doesn't know.
+    error = {"error": "Invalid Pokémon name(s)"}
+    suggestions = {}
+    for name in names:
+        if isinstance(name, str):
+            resolved, close = await name_index.resolve(name)
+            if resolved is None:
+                suggestions[name] = close
+    if suggestions:
+        error["suggestions"] = suggestions
+    return error
+
+async def simulate_battle(pokemon_1, pokemon_2, log="text"):
+    p1, p2 = await fetch_combatants(pokemon_1, pokemon_2)
 
-POKEAPI_BASE = "https://pokeapi.co/api/v2"
+    if not p1 or not p2:
+        return await invalid_names(pokemon_1, pokemon_2)
+
+    return run_battle(p1, p2, log=log)
+
+class Battle:
+    # Iterating a Battle plays it out, yielding one event tuple per action as
+    # it happens. State is kept per slot, so mirror matches work.
+    # The Pokemon entities are shared and read-only; HP is tracked here.
+    __slots__ = ("sides", "rng", "hp", "status", "turns", "moves")
+
+    def __init__(self, p1, p2, rng=random):
+        self.sides = (p1, p2)
+        self.rng = rng
+        self.hp = [p1.hp, p2.hp]
+        self.status = [0, 0]
+        self.turns = 0
+        self.moves = (move_table(p1, p2), move_table(p2, p1))
+
+    def __iter__(self):
+        sides, rng, hp, status, moves = self.sides, self.rng, self.hp, self.status, self.moves
+        p1, p2 = sides
+        rounds = 0
+
+        attacker, defender = (0, 1) if p1.speed >= p2.speed else (1, 0)
+
+        while hp[0] > 0 and hp[1] > 0 and rounds < MAX_ROUNDS:
+            rounds += 1
+            for a, d in ((attacker, defender), (defender, attacker)):
+                atk, defn = sides[a], sides[d]
+                if hp[a] <= 0 or hp[d] <= 0:
+                    break
+                self.turns += 1
+
+                # Status effect: paralysis can skip turn
+                if status[a] == PARALYSIS and rng.random() < 0.25:
+                    yield (self.turns, a, PARALYZED, 0, hp[a], None)
+                    continue
+
+                if moves[a]:
+                    # A random damaging move from the learnset
+                    name, move_power, accuracy, physical, multiplier = rng.choice(moves[a])
+                    if accuracy is not None and rng.random() * 100 >= accuracy:
+                        yield (self.turns, a, MISSED, 0, hp[d], name)
+                        continue
+                    if physical:
+                        effective_attack, defense = atk.attack, defn.defense
+                    else:
+                        effective_attack, defense = atk.special_attack, defn.special_defense
+                else:
+                    # No move data: random power, with the attacker's primary type
+                    name, physical = None, True
+                    move_power = rng.randint(40, 100)
+                    multiplier = type_multiplier(atk.type_ids[0], defn.type_ids)
+                    effective_attack, defense = atk.attack, defn.defense
+
+                # Burn: halve attack
+                if physical and status[a] == BURN:
+                    effective_attack //= 2
+
+                damage = (((2 * effective_attack / defense) * move_power) / 50 + 2) * multiplier
+                damage = int(damage)
+
+                hp[d] -= damage
+                yield (self.turns, a, ATTACK, damage, hp[d], name)
+
+                # Poison damage over time
+                if status[d] == POISON:
+                    poison_dmg = int(hp[d] * 0.05)
+                    hp[d] -= poison_dmg
+                    yield (self.turns, d, POISONED, poison_dmg, hp[d], None)
+
+                # Inflict status effect randomly once
+                if status[d] == 0 and rng.random() < 0.2:
+                    status[d] = rng.choice((PARALYSIS, BURN, POISON))
+                    yield (self.turns, d, STATUS, status[d], hp[d], None)
+
+            attacker, defender = defender, attacker
+
+    @property
+    def names(self):
+        return [self.sides[0].name, self.sides[1].name]
+
+    @property
+    def winner_slot(self):
+        # "pokemon_1" or "pokemon_2"; the name alone is ambiguous in a mirror
+        # match. None for a draw.
+        if self.hp[1] <= 0:
+            return "pokemon_1"
+        if self.hp[0] <= 0:
+            return "pokemon_2"
+        return None
 
-def fetch_pokemon_stats(name):
-    res = requests.get(f"{POKEAPI_BASE}/pokemon/{name}")
-    if res.status_code != 200:
+    @property
+    def winner(self):
+        p1, p2 = self.sides
+        if self.hp[1] <= 0:
+            return p1.name
+        if self.hp[0] <= 0:
+            return p2.name
         return None
-    data = res.json()
+
+    def status_effects(self):
+        # Keyed by slot, like winner_slot, so mirror matches keep both.
+        return {
+            f"pokemon_{i + 1}": STATUS_EFFECTS[code - 1] if code else None
+            for i, code in enumerate(self.status)
+        }
+
+def move_table(attacker, defender):
+    # (name, power, accuracy, physical, multiplier) for each of the
+    # attacker's damaging moves against this defender, STAB included.
+    return _move_table(attacker, defender, attacker.attacks)
+
+@lru_cache(maxsize=4096)
+def _move_table(attacker, defender, attacks):
+    # Memoized per matchup; `attacks` is part of the key because it is
+    # filled in after the entity is created.
+    return tuple(
+        (
+            move.name,
+            move.power,
+            move.accuracy,
+            move.physical,
+            type_multiplier(move.type_id, defender.type_ids) * (STAB if move.type_id in attacker.type_ids else 1),
+        )
+        for move in attacks or ()
+    )
+
+def render_event(event, names):
+    _, actor, action, value, hp, move = event
+    name = names[actor]
+    if action == ATTACK:
+        used = f"used {move}" if move else "used a move"
+        return f"{name} {used} and dealt {value} damage to {names[1 - actor]} ({hp} HP left)"
+    if action == MISSED:
+        return f"{name} used {move} but it missed!"
+    if action == PARALYZED:
+        return f"{name} is paralyzed and can’t move!"
+    if action == POISONED:
+        return f"{name} took {value} poison damage! ({hp} HP left)"
+    return f"{name} is now affected by {STATUS_EFFECTS[value - 1]}!"
+
+def run_battle(p1, p2, rng=random, log="text"):
+    with profiling.phase("battle"):
+        start = time.perf_counter()
+        battle = Battle(p1, p2, rng)
+        if log == "text":
+            names = battle.names
+            details = {"battle_log": [render_event(e, names) for e in battle]}
+        elif log == "events":
+            details = {"pokemon": battle.names, "events": list(battle)}
+        else:
+            details = {}
+            for _ in battle:
+                pass
+        metrics.observe_battle("scalar", battle.turns, time.perf_counter() - start)
     return {
-        "name": name,
-        "hp": next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'hp'),
-        "attack": next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'attack'),
-        "defense": next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'defense'),
-        "speed": next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'speed'),
-        "type": data['types'][0]['type']['name']
+        "winner": battle.winner,
+        "winner_slot": battle.winner_slot,
+        **details,
+        "status_effects": battle.status_effects(),
+        "turns": battle.turns,
     }
 
-def simulate_battle(pokemon_1, pokemon_2):
-    p1 = fetch_pokemon_stats(pokemon_1)
-    p2 = fetch_pokemon_stats(pokemon_2)
-
-    if not p1 or not p2:
-        return {"error": "Invalid Pokémon name(s)"}
-
-    log = []
-    status = {p1['name']: None, p2['name']: None}
-
-    attacker, defender = (p1, p2) if p1['speed'] >= p2['speed'] else (p2, p1)
-
-    while p1['hp'] > 0 and p2['hp'] > 0:
-        for atk, defn in [(attacker, defender), (defender, attacker)]:
-            if atk['hp'] <= 0 or defn['hp'] <= 0:
-                break
-
-            # Status effect: paralysis can skip turn
-            if status[atk['name']] == 'paralysis' and random.random() < 0.25:
-                log.append(f"{atk['name']} is paralyzed and can’t move!")
-                continue
-
-            # Random move power
-            move_power = random.randint(40, 100)
-            multiplier = get_type_multiplier(atk['type'], defn['type'])
-
-            # Burn: halve attack
-            effective_attack = atk['attack'] // 2 if status[atk['name']] == 'burn' else atk['attack']
-
-            damage = (((2 * effective_attack / defn['defense']) * move_power) / 50 + 2) * multiplier
-            damage = int(damage)
-
-            defn['hp'] -= damage
-            log.append(f"{atk['name']} used a move and dealt {damage} damage to {defn['name']} ({defn['hp']} HP left)")
-
-            # Poison damage over time
-            if status[defn['name']] == 'poison':
-                poison_dmg = int(defn['hp'] * 0.05)
-                defn['hp'] -= poison_dmg
-                log.append(f"{defn['name']} took {poison_dmg} poison damage! ({defn['hp']} HP left)")
-
-            # Inflict status effect randomly once
-            if status[defn['name']] is None and random.random() < 0.2:
-                inflicted = random.choice(STATUS_EFFECTS)
-                status[defn['name']] = inflicted
-                log.append(f"{defn['name']} is now affected by {inflicted}!")
-
-        attacker, defender = defender, attacker
-
-    winner = p1['name'] if p2['hp'] <= 0 else p2['name']
-    return {"winner": winner, "battle_log": log, "status_effects": status}
\ No newline at end of file
+def stream_battle(p1, p2, sse=False, rng=random):
+    # Encodes each turn as it is played: NDJSON lines by default, or
+    # Server-Sent Events with "turn" and "result" event types.
+    def encode(event, payload):
+        data = json.dumps(payload, ensure_ascii=False)
+        return f"event: {event}\ndata: {data}\n\n" if sse else data + "\n"
+
+    battle = Battle(p1, p2, rng)
+    names = battle.names
+    for event in battle:
+        yield encode("turn", {"turn": event[0], "message": render_event(event, names)})
+    yield encode("result", {
+        "winner": battle.winner,
+        "winner_slot": battle.winner_slot,
+        "status_effects": battle.status_effects(),
+        "turns": battle.turns,
+    })
\ No newline at end of file
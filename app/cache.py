@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    # Entries are fresh for `ttl` seconds, then stale for `stale_ttl` more.
+    # get_or_load serves a stale entry immediately and refreshes it in the
+    # background; a failed refresh leaves the stale entry in place.
+    def __init__(self, maxsize=1024, ttl=3600, stale_ttl=0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.stale = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, fresh = self._lookup(key)
+            if value is not _MISSING and not fresh:
+                value = _MISSING
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    async def get_or_load(self, key, loader, ttl=None):
+        # Single-flight: concurrent misses for the same key await one shared
+        # load task instead of each hitting upstream. The task is shielded so
+        # a cancelled caller doesn't abort the load for everyone else.
+        with self._lock:
+            value, fresh = self._lookup(key)
+            if value is not _MISSING and fresh:
+                return value
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = asyncio.ensure_future(self._load(key, loader, ttl))
+                flight.add_done_callback(_consume_exception)
+                self._inflight[key] = flight
+            elif value is _MISSING:
+                self.coalesced += 1
+            if value is not _MISSING:
+                # Stale: the flight above is a background refresh.
+                self.stale += 1
+                return value
+        return await asyncio.shield(flight)
+
+    async def _load(self, key, loader, ttl):
+        try:
+            value = await loader()
+            if value is not None:
+                self.set(key, value, ttl)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def keys(self):
+        # Least recently used first; expired entries included.
+        with self._lock:
+            return list(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+                "stale": self.stale,
+            }
+
+    def _lookup(self, key):
+        # (value or _MISSING, fresh). Stale entries count as hits; entries
+        # past their stale window are dropped.
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return _MISSING, False
+        value, expires = entry
+        now = time.monotonic()
+        if expires + self.stale_ttl <= now:
+            del self._data[key]
+            self.misses += 1
+            return _MISSING, False
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value, expires > now
+
+    def _store(self, key, value, ttl):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+def _consume_exception(task):
+    # Callers re-raise the error; this only silences "exception never
+    # retrieved" when every caller was cancelled first, or for background
+    # refreshes nobody awaits.
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,73 @@
+import os
+
+POKEAPI_BASE = os.environ.get("POKEAPI_BASE", "https://pokeapi.co/api/v2").rstrip("/")
+
+POKEAPI_CACHE_SIZE = int(os.environ.get("POKEAPI_CACHE_SIZE", 2048))
+POKEAPI_CACHE_TTL = float(os.environ.get("POKEAPI_CACHE_TTL", 6 * 3600))
+# After POKEAPI_CACHE_TTL, entries are served stale for up to this long
+# while they are refreshed in the background.
+POKEAPI_STALE_TTL = float(os.environ.get("POKEAPI_STALE_TTL", 24 * 3600))
+# How long a 404 from PokeAPI is remembered before the name is tried again.
+NEGATIVE_CACHE_TTL = float(os.environ.get("NEGATIVE_CACHE_TTL", 600))
+# Cache tier shared by all worker processes: sqlite:///path or redis://...
+# Unset to keep caches per process only.
+SHARED_CACHE_URL = os.environ.get("SHARED_CACHE_URL", "")
+
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 32))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 10))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", 3))
+HTTP_BACKOFF = float(os.environ.get("HTTP_BACKOFF", 0.2))
+# Budget for one upstream call, retries included.
+HTTP_TOTAL_TIMEOUT = float(os.environ.get("HTTP_TOTAL_TIMEOUT", 15))
+# Consecutive failed upstream calls that open the circuit breaker, and how
+# long it stays open before a single probe request is let through.
+BREAKER_THRESHOLD = int(os.environ.get("BREAKER_THRESHOLD", 5))
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", 30))
+
+# At most UPSTREAM_CONCURRENCY PokeAPI calls run at once, process-wide. Up
+# to UPSTREAM_QUEUE_SIZE more wait, each for at most UPSTREAM_QUEUE_TIMEOUT
+# seconds; anything beyond that is refused (503) instead of piling up.
+UPSTREAM_CONCURRENCY = int(os.environ.get("UPSTREAM_CONCURRENCY", 16))
+UPSTREAM_QUEUE_SIZE = int(os.environ.get("UPSTREAM_QUEUE_SIZE", 256))
+UPSTREAM_QUEUE_TIMEOUT = float(os.environ.get("UPSTREAM_QUEUE_TIMEOUT", 5))
+# Upstream fetches one of the app's own batches (a learnset's moves) runs
+# at a time, kept well below UPSTREAM_QUEUE_SIZE so a batch never overflows
+# the queue by itself and admission control only sheds client load.
+MOVE_FETCH_CONCURRENCY = int(os.environ.get("MOVE_FETCH_CONCURRENCY", 8))
+
+# Admission control for the /resource, /tool and /mcp routes: a token bucket
+# per client (CLIENT_RATE requests per second, bursts of CLIENT_BURST; 0
+# disables it), answered with 429, and a cap on requests in progress,
+# answered with 503. Clients are told apart by peer address, or by the
+# CLIENT_ID_HEADER request header when set (e.g. behind a proxy).
+CLIENT_RATE = float(os.environ.get("CLIENT_RATE", 50))
+CLIENT_BURST = float(os.environ.get("CLIENT_BURST", 100))
+CLIENT_ID_HEADER = os.environ.get("CLIENT_ID_HEADER", "").lower()
+MAX_INFLIGHT_REQUESTS = int(os.environ.get("MAX_INFLIGHT_REQUESTS", 512))
+
+# live: always PokeAPI; local: only the imported SQLite store;
+# local_fallback: the store first, PokeAPI for anything it doesn't have.
+DATA_SOURCE = os.environ.get("DATA_SOURCE", "live")
+LOCAL_STORE_PATH = os.environ.get("LOCAL_STORE_PATH", "data/pokeapi.sqlite3")
+
+BATCH_MAX_NAMES = int(os.environ.get("BATCH_MAX_NAMES", 50))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 8))
+
+# Startup warm-up: how many species to preload in the background, how many
+# at a time (also the number of upstream calls it makes at once), whether to
+# load the whole move catalog (unset: only when a local store or shared cache
+# can serve it), and where the most recently used species are recorded at
+# shutdown to be the next warm set.
+WARMUP_SPECIES = int(os.environ.get("WARMUP_SPECIES", 50))
+WARMUP_CONCURRENCY = int(os.environ.get("WARMUP_CONCURRENCY", 4))
+_warmup_moves = os.environ.get("WARMUP_MOVES", "").lower()
+WARMUP_MOVES = _warmup_moves in ("1", "true", "yes") if _warmup_moves else None
+WARMUP_SNAPSHOT = os.environ.get("WARMUP_SNAPSHOT", "data/warm_set.json")
+
+# Browser origins allowed to call POST /mcp besides localhost ("*" for any).
+MCP_ALLOWED_ORIGINS = tuple(o.strip() for o in os.environ.get("MCP_ALLOWED_ORIGINS", "").split(",") if o.strip())
+# Most messages in one JSON-RPC batch; members run BATCH_CONCURRENCY at a time.
+MCP_BATCH_MAX = int(os.environ.get("MCP_BATCH_MAX", 50))
+
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
@@ -1,34 +1,99 @@
-import requests
-from app.utils import get_evolution_chain
+import asyncio
+from app import name_index
+from app.models import MOVE_FIELDS, Move
+from app.pokeapi import UpstreamError, _fetch_moves, fetch_pokemon, fetch_species_chain, seed_moves
 
-POKEAPI_BASE = "https://pokeapi.co/api/v2"
+# Fields of a get_pokemon_data result, for `fields=` selection. "name" is
+# always returned; only the evolution fields need the species and chain.
+RESOURCE_FIELDS = ("name", "types", "abilities", "stats", "moves", "evolution", "evolution_tree")
+CHAIN_FIELDS = frozenset(("evolution", "evolution_tree"))
 
-def get_pokemon_data(name):
-    pokemon_url = f"{POKEAPI_BASE}/pokemon/{name}"
-    species_url = f"{POKEAPI_BASE}/pokemon-species/{name}"
+def parse_fields(fields):
+    # "a,b" or ["a", "b"] -> {"a", "b"}; None selects every field. Raises
+    # ValueError for unknown fields.
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    selected = {f.strip() for f in fields if f.strip()}
+    unknown = selected.difference(RESOURCE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}; expected any of {', '.join(RESOURCE_FIELDS)}")
+    return selected
 
-    poke_res = requests.get(pokemon_url)
-    species_res = requests.get(species_url)
+async def get_pokemon_data(name, fields=None):
+    # fields: a set of RESOURCE_FIELDS to return, or None for all of them.
+    # Sub-resources no requested field needs are not fetched.
+    name, suggestions = await name_index.resolve(name)
+    if name is None:
+        return {"error": "Pokemon not found", "suggestions": suggestions}
 
-    if poke_res.status_code != 200 or species_res.status_code != 200:
-        return {"error": "Pokemon not found"}
+    if fields is None or not CHAIN_FIELDS.isdisjoint(fields):
+        # The evolution chain only depends on the species, so it is resolved
+        # while the (larger) pokemon document is still in flight.
+        pokemon, (found, chain) = await asyncio.gather(
+            fetch_pokemon(name),
+            fetch_species_chain(name),
+        )
+    else:
+        pokemon, found, chain = await fetch_pokemon(name), True, None
 
-    poke_data = poke_res.json()
-    species_data = species_res.json()
+    if pokemon is None or not found:
+        return {"error": "Pokemon not found"}
 
-    types = [t['type']['name'] for t in poke_data['types']]
-    abilities = [a['ability']['name'] for a in poke_data['abilities']]
-    stats = {s['stat']['name']: s['base_stat'] for s in poke_data['stats']}
-    moves = [m['move']['name'] for m in poke_data['moves']]
+    data = {
+        "name": pokemon.name,
+        "types": list(pokemon.types),
+        "abilities": list(pokemon.abilities),
+        "stats": pokemon.stats,
+        "moves": list(pokemon.moves[:10]),
+        "evolution": list(chain.species) if chain else [],
+        "evolution_tree": chain.tree if chain else None,
+    }
+    if fields is not None:
+        data = {key: value for key, value in data.items() if key == "name" or key in fields}
+    return data
 
-    evolution_chain_url = species_data['evolution_chain']['url']
-    evolution_chain = get_evolution_chain(evolution_chain_url)
+async def get_pokemon_moves(name, offset=0, limit=20):
+    # One page of the learnset with catalog details. Moves the catalog can't
+    # resolve, or that PokeAPI fails to return, are listed by name with null
+    # details. Uncached moves are fetched MOVE_FETCH_CONCURRENCY at a time.
+    name, suggestions = await name_index.resolve(name)
+    if name is None:
+        return {"error": "Pokemon not found", "suggestions": suggestions}
+    pokemon = await fetch_pokemon(name)
+    if pokemon is None:
+        return {"error": "Pokemon not found"}
 
+    seed_moves()
+    page = pokemon.moves[offset:offset + limit]
+    details = await _fetch_moves(page)
+    for move in details:
+        if isinstance(move, Exception) and not isinstance(move, UpstreamError):
+            raise move
     return {
-        "name": poke_data['name'],
-        "types": types,
-        "abilities": abilities,
-        "stats": stats,
-        "moves": moves[:10],
-        "evolution": evolution_chain
-    }
\ No newline at end of file
+        "name": pokemon.name,
+        "total": len(pokemon.moves),
+        "offset": offset,
+        "limit": limit,
+        "moves": [
+            move.summary() if isinstance(move, Move) else {"name": m, **dict.fromkeys(MOVE_FIELDS)}
+            for m, move in zip(page, details)
+        ],
+    }
+
+async def get_pokemon_batch(names, concurrency, fields=None):
+    # Duplicates collapse to one lookup; evolution chains shared by several
+    # requested species are fetched once through the cache's single-flight.
+    unique = list(dict.fromkeys(names))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(name):
+        async with semaphore:
+            try:
+                return await get_pokemon_data(name, fields)
+            except Exception as e:
+                return {"error": f"Failed to fetch Pokémon data: {e}"}
+
+    results = await asyncio.gather(*(fetch(name) for name in unique))
+    return dict(zip(unique, results))
@@ -0,0 +1,205 @@
+import asyncio
+import time
+from collections import deque
+import httpx
+from app import config, metrics
+
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+_client = None
+_client_loop = None
+
+
+class CircuitOpenError(httpx.HTTPError):
+    def __init__(self, retry_after):
+        super().__init__("PokeAPI circuit breaker is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    # Closed: calls go through. After `threshold` consecutive failures it
+    # opens and calls fail fast for `cooldown` seconds; then it half-opens
+    # and lets one probe through, closing on success and reopening on failure.
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def before_call(self):
+        # Returns True if this call is the half-open probe.
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        raise CircuitOpenError(max(0.0, self.opened_at + self.cooldown - time.monotonic()))
+
+    def record(self, ok):
+        self.probing = False
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+        else:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+        metrics.UPSTREAM_CIRCUIT_OPEN.set(0 if self.opened_at is None else 1)
+
+
+breaker = CircuitBreaker(config.BREAKER_THRESHOLD, config.BREAKER_COOLDOWN)
+
+
+class UpstreamBusyError(httpx.HTTPError):
+    # Refused locally by the limiter; PokeAPI was not called.
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Too many PokeAPI calls in progress ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class UpstreamLimiter:
+    # A FIFO semaphore with a bounded queue and a bounded wait, so a burst
+    # costs PokeAPI at most `limit` concurrent calls and excess callers are
+    # refused quickly instead of queueing without end. A released slot is
+    # handed straight to the oldest waiter. Waiters are futures of whichever
+    # loop they were created on, so the limiter isn't tied to one loop.
+    def __init__(self, limit, queue_size, timeout):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters = deque()
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            metrics.UPSTREAM_IN_FLIGHT.set(self.active)
+            metrics.UPSTREAM_QUEUE_WAIT.observe(0)
+            return
+        if len(self._waiters) >= self.queue_size:
+            metrics.UPSTREAM_REJECTED.labels("queue_full").inc()
+            raise UpstreamBusyError("queue full", 1)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        metrics.UPSTREAM_QUEUE_DEPTH.set(len(self._waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as the wait ended; pass it on.
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                metrics.UPSTREAM_REJECTED.labels("timeout").inc()
+                raise UpstreamBusyError("timed out waiting", 1) from None
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            metrics.UPSTREAM_QUEUE_DEPTH.set(len(self._waiters))
+            metrics.UPSTREAM_QUEUE_WAIT.observe(time.perf_counter() - start)
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        metrics.UPSTREAM_IN_FLIGHT.set(self.active)
+
+
+limiter = UpstreamLimiter(config.UPSTREAM_CONCURRENCY, config.UPSTREAM_QUEUE_SIZE, config.UPSTREAM_QUEUE_TIMEOUT)
+
+
+def _build_client():
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config.HTTP_POOL_SIZE,
+            max_keepalive_connections=config.HTTP_POOL_SIZE,
+        ),
+        timeout=httpx.Timeout(
+            config.HTTP_READ_TIMEOUT,
+            connect=config.HTTP_CONNECT_TIMEOUT,
+            pool=config.HTTP_READ_TIMEOUT,
+        ),
+        headers={"Accept": "application/json"},
+    )
+
+
+def get_client():
+    # The pool is bound to the event loop it was created on; CLI tools that
+    # call asyncio.run() more than once get a fresh client per loop.
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = _build_client()
+        _client_loop = loop
+    return _client
+
+
+async def get(url, **kwargs):
+    # Fails fast with CircuitOpenError while the breaker is open, and with
+    # UpstreamBusyError if no concurrency slot frees up in time; neither
+    # counts against the breaker. A call counts as failed if it ends in a
+    # transport error, runs past HTTP_TOTAL_TIMEOUT, or still gets a
+    # retryable status after retries, or raises anything else (a bad URL,
+    # say), so a half-open probe always settles the breaker. The slot is
+    # held across retries.
+    probe = breaker.before_call()
+    try:
+        await limiter.acquire()
+    except BaseException:
+        if probe:
+            breaker.probing = False
+        raise
+    try:
+        res = await asyncio.wait_for(_get_with_retries(url, **kwargs), config.HTTP_TOTAL_TIMEOUT)
+    except asyncio.TimeoutError:
+        breaker.record(False)
+        raise httpx.TimeoutException(f"No response within {config.HTTP_TOTAL_TIMEOUT}s: {url}")
+    except asyncio.CancelledError:
+        if probe:
+            breaker.probing = False
+        raise
+    except BaseException:
+        breaker.record(False)
+        raise
+    finally:
+        limiter.release()
+    breaker.record(res.status_code not in RETRY_STATUSES)
+    return res
+
+
+async def _get_with_retries(url, **kwargs):
+    client = get_client()
+    for attempt in range(config.HTTP_RETRIES + 1):
+        last = attempt == config.HTTP_RETRIES
+        try:
+            res = await client.get(url, **kwargs)
+        except (httpx.TransportError, httpx.TimeoutException):
+            if last:
+                raise
+        else:
+            if res.status_code not in RETRY_STATUSES or last:
+                return res
+        await asyncio.sleep(config.HTTP_BACKOFF * (2 ** attempt))
+
+
+async def close():
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _client_loop = None
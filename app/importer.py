@@ -0,0 +1,128 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import httpx
+from app import config, http_client
+from app.local_store import KINDS, StoreWriter
+from app.pokeapi import api_path
+
+# How many times one document is retried after an open circuit breaker, a
+# full upstream queue or a failed call before it counts as failed.
+MAX_WAITS = 5
+
+
+def iter_dump(directory, kind):
+    # Dump layout mirrors the API: <dir>/pokemon/pikachu.json,
+    # <dir>/evolution-chain/1.json, ...
+    kind_dir = os.path.join(directory, kind)
+    if not os.path.isdir(kind_dir):
+        return
+    for filename in sorted(os.listdir(kind_dir)):
+        if filename.endswith(".json"):
+            with open(os.path.join(kind_dir, filename), encoding="utf-8") as f:
+                yield json.load(f)
+
+
+async def _get_json(path):
+    # An open breaker or a full queue says "not now", not "failed": wait as
+    # long as it asks and try again. Failed calls are tried again too; once
+    # enough fail in a row the breaker opens and paces the retries.
+    for attempt in range(MAX_WAITS + 1):
+        last = attempt == MAX_WAITS
+        try:
+            res = await http_client.get(f"{config.POKEAPI_BASE}/{path}")
+        except (http_client.CircuitOpenError, http_client.UpstreamBusyError) as e:
+            if last:
+                raise
+            await asyncio.sleep(max(e.retry_after, 0.1))
+            continue
+        except httpx.TransportError:
+            if last:
+                raise
+            continue
+        if res.status_code not in http_client.RETRY_STATUSES or last:
+            res.raise_for_status()
+            return res.json()
+
+
+async def iter_live(kind, concurrency, limit=None, failed=None):
+    # Paths that couldn't be fetched are appended to `failed`.
+    listing = await _get_json(f"{kind}?limit={limit or 100000}&offset=0")
+    paths = [api_path(r["url"]) for r in listing["results"]]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(path):
+        async with semaphore:
+            try:
+                return await _get_json(path)
+            except Exception as e:
+                print(f"  failed {path}: {e}", file=sys.stderr)
+                if failed is not None:
+                    failed.append(path)
+                return None
+
+    for batch_start in range(0, len(paths), concurrency * 4):
+        batch = paths[batch_start:batch_start + concurrency * 4]
+        for doc in await asyncio.gather(*(fetch(p) for p in batch)):
+            if doc is not None:
+                yield doc
+
+
+async def run_import(db_path, dump_dir=None, concurrency=16, limit=None):
+    # Build into a temp file and swap it in, so a running server never
+    # reads a half-written store. If any document couldn't be fetched the
+    # existing store is left alone; returns the failed paths.
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    failed = []
+    writer = StoreWriter(tmp_path)
+    complete = False
+    try:
+        for kind in KINDS:
+            count = 0
+            if dump_dir:
+                for doc in iter_dump(dump_dir, kind):
+                    writer.put(kind, doc)
+                    count += 1
+            else:
+                async for doc in iter_live(kind, concurrency, limit, failed):
+                    writer.put(kind, doc)
+                    count += 1
+            writer.commit()
+            print(f"{kind}: {count} documents")
+        complete = not failed
+    finally:
+        writer.close()
+        await http_client.close()
+        if not complete:
+            os.remove(tmp_path)
+    if complete:
+        os.replace(tmp_path, db_path)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.importer",
+        description="Build the local PokeAPI store used when DATA_SOURCE is local or local_fallback.",
+    )
+    parser.add_argument("--db", default=config.LOCAL_STORE_PATH, help="output SQLite file")
+    parser.add_argument("--dump", help="read JSON documents from this dump directory instead of PokeAPI")
+    parser.add_argument("--concurrency", type=int, default=16, help="parallel upstream fetches")
+    parser.add_argument("--limit", type=int, help="only import the first N entries of each kind")
+    args = parser.parse_args(argv)
+    try:
+        failed = asyncio.run(run_import(args.db, args.dump, args.concurrency, args.limit))
+    except httpx.HTTPError as e:
+        raise SystemExit(f"Import failed ({e}); {args.db} was not replaced")
+    if failed:
+        raise SystemExit(f"{len(failed)} documents couldn't be fetched; {args.db} was not replaced")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from app import config
+
+KINDS = ("pokemon", "pokemon-species", "evolution-chain", "type", "move")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (path TEXT PRIMARY KEY, body BLOB NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS aliases (path TEXT PRIMARY KEY, target TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+
+def _named(items, key):
+    return [{key: {"name": i[key]["name"], "url": i[key]["url"]}} for i in items]
+
+
+def compact(kind, doc):
+    # Keep only the fields the app reads; upstream pokemon documents are
+    # mostly per-version move and sprite metadata.
+    if kind == "pokemon":
+        return {
+            "id": doc["id"],
+            "name": doc["name"],
+            "types": [{"slot": t["slot"], "type": t["type"]} for t in doc["types"]],
+            "abilities": [
+                {"ability": a["ability"], "is_hidden": a.get("is_hidden", False)}
+                for a in doc["abilities"]
+            ],
+            "stats": [{"base_stat": s["base_stat"], "stat": s["stat"]} for s in doc["stats"]],
+            "moves": _named(doc["moves"], "move"),
+            "species": doc.get("species"),
+        }
+    if kind == "pokemon-species":
+        return {
+            "id": doc["id"],
+            "name": doc["name"],
+            "evolution_chain": doc.get("evolution_chain"),
+            "varieties": doc.get("varieties", []),
+        }
+    if kind == "move":
+        return {
+            "id": doc["id"],
+            "name": doc["name"],
+            "type": doc["type"],
+            "power": doc.get("power"),
+            "accuracy": doc.get("accuracy"),
+            "pp": doc.get("pp"),
+            "priority": doc.get("priority", 0),
+            "damage_class": doc.get("damage_class"),
+        }
+    if kind == "type":
+        return {
+            "id": doc["id"],
+            "name": doc["name"],
+            "damage_relations": doc.get("damage_relations", {}),
+        }
+    return doc
+
+
+def encode(doc):
+    return zlib.compress(json.dumps(doc, separators=(",", ":")).encode())
+
+
+def decode(body):
+    return json.loads(zlib.decompress(body))
+
+
+def document_paths(kind, doc):
+    # Documents are stored under their name where they have one (that is
+    # what callers pass in), with the numeric id as an alias.
+    ident = f"{kind}/{doc['id']}"
+    if "name" in doc:
+        return f"{kind}/{doc['name']}", [ident]
+    return ident, []
+
+
+class LocalStore:
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM documents WHERE path = COALESCE("
+                "(SELECT target FROM aliases WHERE path = ?), ?)",
+                (path, path),
+            ).fetchone()
+        return None if row is None else decode(row[0])
+
+    def paths(self, kind):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM documents WHERE path >= ? AND path < ?",
+                (f"{kind}/", f"{kind}0"),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def documents(self, kind):
+        # Every stored document of one kind, read in a single query.
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body FROM documents WHERE path >= ? AND path < ?",
+                (f"{kind}/", f"{kind}0"),
+            ).fetchall()
+        return [decode(r[0]) for r in rows]
+
+    def close(self):
+        self._conn.close()
+
+
+class StoreWriter:
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def put(self, kind, doc):
+        path, aliases = document_paths(kind, doc)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO documents VALUES (?, ?)",
+            (path, encode(compact(kind, doc))),
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO aliases VALUES (?, ?)",
+            [(alias, path) for alias in aliases],
+        )
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        self._conn.commit()
+        self._conn.execute("VACUUM")
+        self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None and os.path.exists(config.LOCAL_STORE_PATH):
+        with _store_lock:
+            if _store is None:
+                _store = LocalStore(config.LOCAL_STORE_PATH)
+    return _store
+
+
+def lookup(path):
+    store = get_store()
+    return None if store is None else store.get(path)
@@ -1,13 +1,165 @@
-from fastapi import FastAPI, Query
-from app.data_resource import get_pokemon_data
-from app.battle_simulator import simulate_battle
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import orjson
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from app import admission, config, http_client, mcp, metrics, name_index, profiling, shared_cache, warmup
+from app.data_resource import get_pokemon_batch, get_pokemon_data, get_pokemon_moves, parse_fields
+from app.battle_simulator import fetch_combatants, invalid_names, simulate_battle, stream_battle
+from app.team_battle import TEAM_SIZE, simulate_team_battle
+from app.pokeapi import UpstreamError
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # Warm caches in the background (see app/warmup.py). Requests are served
+    # meanwhile; ones that need the name index wait for it.
+    shared_cache.open_backend()
+    warmup.start()
+    yield
+    warmup.stop()
+    await http_client.close()
+    await shared_cache.close()
+
+class FastJSONResponse(JSONResponse):
+    # orjson instead of the stdlib encoder. The data endpoints return it
+    # directly, which also skips FastAPI's jsonable_encoder pass over the
+    # result; their results are plain dicts, lists and scalars already.
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+app.add_middleware(admission.AdmissionMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+if config.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+@app.exception_handler(UpstreamError)
+async def upstream_unavailable(request, exc):
+    # Only reached for data that isn't cached, not even stale.
+    headers = {"Retry-After": str(max(1, round(exc.retry_after)))} if exc.retry_after is not None else None
+    return FastJSONResponse({"error": "PokeAPI unavailable", "detail": str(exc)}, status_code=503, headers=headers)
+
+def _fields(fields):
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
 @app.get("/resource/pokemon")
-def fetch_pokemon_data(name: str = Query(...)):
-    return get_pokemon_data(name.lower())
+async def fetch_pokemon_data(name: str = Query(...), fields: Optional[str] = Query(None)):
+    return FastJSONResponse(await get_pokemon_data(name.lower(), _fields(fields)))
+
+@app.get("/resource/pokemon/moves")
+async def fetch_pokemon_moves(
+    name: str = Query(...),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+):
+    return FastJSONResponse(await get_pokemon_moves(name.lower(), offset, limit))
+
+@app.get("/resource/pokemon/search")
+async def search_pokemon(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    matches = await name_index.search(q, limit)
+    if matches is None:
+        raise HTTPException(503, "Name index unavailable")
+    return {"query": q, "matches": matches}
+
+class BatchRequest(BaseModel):
+    names: List[str]
+    fields: Optional[List[str]] = None
+
+@app.post("/resource/pokemon/batch")
+async def fetch_pokemon_batch(request: BatchRequest):
+    names = [n.strip().lower() for n in request.names if n.strip()]
+    if len(set(names)) > config.BATCH_MAX_NAMES:
+        raise HTTPException(400, f"At most {config.BATCH_MAX_NAMES} distinct names per batch")
+    results = await get_pokemon_batch(names, config.BATCH_CONCURRENCY, _fields(request.fields))
+    return FastJSONResponse({"results": results})
 
 @app.post("/tool/simulate_battle")
-def battle(pokemon_1: str, pokemon_2: str):
-    return simulate_battle(pokemon_1.lower(), pokemon_2.lower())
\ No newline at end of file
+async def battle(pokemon_1: str, pokemon_2: str, log: str = Query("text", pattern="^(none|events|text)$")):
+    return FastJSONResponse(await simulate_battle(pokemon_1.lower(), pokemon_2.lower(), log))
+
+class TeamBattleRequest(BaseModel):
+    team_1: List[str]
+    team_2: List[str]
+
+@app.post("/tool/simulate_team_battle")
+async def team_battle(request: TeamBattleRequest, log: str = Query("text", pattern="^(none|events|text)$")):
+    teams = []
+    for team in (request.team_1, request.team_2):
+        names = [n.strip().lower() for n in team if n.strip()]
+        if not 1 <= len(names) <= TEAM_SIZE:
+            raise HTTPException(400, f"Each team needs 1 to {TEAM_SIZE} Pokémon")
+        teams.append(names)
+    return FastJSONResponse(await simulate_team_battle(*teams, log))
+
+@app.post("/tool/simulate_battle/stream")
+async def battle_stream(pokemon_1: str, pokemon_2: str, format: str = Query("ndjson", pattern="^(ndjson|sse)$")):
+    p1, p2 = await fetch_combatants(pokemon_1.lower(), pokemon_2.lower())
+    if not p1 or not p2:
+        return await invalid_names(pokemon_1, pokemon_2)
+    sse = format == "sse"
+    return StreamingResponse(
+        stream_battle(p1, p2, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+    )
+
+@app.post("/tool/battle_odds")
+async def odds(
+    pokemon_1: str,
+    pokemon_2: str,
+    n: int = Query(10000, ge=1, le=200000),
+    seed: Optional[int] = None,
+):
+    p1, p2 = await fetch_combatants(pokemon_1.lower(), pokemon_2.lower())
+    if not p1 or not p2:
+        return await invalid_names(pokemon_1, pokemon_2)
+    # Imported on first use (or by the warm-up): it pulls in NumPy.
+    from app.monte_carlo import battle_odds
+    return FastJSONResponse(await run_in_threadpool(battle_odds, p1, p2, n, seed))
+
+@app.post("/mcp")
+async def mcp_endpoint(request: Request):
+    # MCP streamable HTTP transport: one JSON-RPC message or batch per POST,
+    # answered with plain JSON (no SSE streams; this server never sends
+    # requests or notifications of its own). See app/mcp.py.
+    if not mcp.origin_allowed(request.headers.get("origin")):
+        return FastJSONResponse({"error": "Origin not allowed"}, status_code=403)
+    response = await mcp.handle_bytes(await request.body())
+    if response is None:
+        return Response(status_code=202)
+    return FastJSONResponse(response)
+
+@app.get("/mcp", include_in_schema=False)
+def mcp_stream():
+    return Response(status_code=405, headers={"Allow": "POST"})
+
+@app.get("/healthz")
+def healthz():
+    # Liveness: answers as soon as the process is up, with warm-up progress.
+    return {"status": "ok", "ready": warmup.ready(), "warmup": warmup.progress}
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: 503 until warm-up has finished, so a rolling deploy only
+    # sends traffic to warm workers.
+    status = 200 if warmup.ready() else 503
+    return FastJSONResponse({"ready": warmup.ready(), "warmup": warmup.progress}, status_code=status)
+
+@app.get("/cache/stats")
+def cache_stats():
+    # Per-process caches; the shared tier is reported in /metrics.
+    return {name: c.stats() for name, c in metrics.CACHES.caches.items()}
+
+if config.PROFILING_ENABLED:
+    @app.get("/debug/profiles", include_in_schema=False)
+    def recent_profiles():
+        return list(profiling.recent)
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
\ No newline at end of file
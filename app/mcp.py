@@ -0,0 +1,376 @@
+import asyncio
+import sys
+from urllib.parse import parse_qs, urlsplit
+import orjson
+from app import config, http_client, shared_cache, warmup
+from app.battle_simulator import fetch_combatants, invalid_names, simulate_battle
+from app.data_resource import get_pokemon_data, get_pokemon_moves, parse_fields
+from app.pokeapi import UpstreamError
+from app.team_battle import TEAM_SIZE, simulate_team_battle
+
+# Model Context Protocol server (revision 2025-03-26): JSON-RPC 2.0 over
+# stdio (`python -m app.mcp`) or streamable HTTP (POST /mcp in app.main).
+# Pokémon data is exposed as the pokemon://{name} resource (and as a tool,
+# for clients that only call tools), battles as tools. The members of a
+# JSON-RPC batch, and stdio messages that arrive while earlier ones are still
+# running, are handled concurrently; each response carries its request id.
+
+PROTOCOL_VERSION = "2025-03-26"
+SUPPORTED_VERSIONS = (PROTOCOL_VERSION, "2024-11-05")
+SERVER_INFO = {"name": "pokemon-battle-simulator", "version": "1.0.0"}
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+RESOURCE_NOT_FOUND = -32002
+
+LOG_MODES = ("text", "events", "none")
+MAX_ODDS_BATTLES = 200000
+
+
+def _json(value):
+    # Battle odds have integer keys (the turn histogram).
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+class RPCError(Exception):
+    def __init__(self, code, message, data=None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+
+RESOURCE_TEMPLATES = [
+    {
+        "uriTemplate": "pokemon://{name}",
+        "name": "Pokémon data",
+        "description": (
+            "Types, abilities, base stats, first moves and evolution family of a Pokémon. "
+            "Add ?fields=types,stats to get only some fields; only the evolution fields cost extra lookups."
+        ),
+        "mimeType": "application/json",
+    },
+    {
+        "uriTemplate": "pokemon://{name}/moves",
+        "name": "Pokémon learnset",
+        "description": "Moves a Pokémon can learn, with type, power, accuracy, PP, priority and damage class. "
+                       "Paged with ?offset=0&limit=20 (limit up to 100).",
+        "mimeType": "application/json",
+    },
+]
+
+_NAME = {"type": "string", "description": "Pokémon name or National Dex number"}
+_LOG = {
+    "type": "string",
+    "enum": list(LOG_MODES),
+    "default": "text",
+    "description": "text: readable battle log; events: compact event tuples; none: result only",
+}
+_TEAM = {"type": "array", "items": _NAME, "minItems": 1, "maxItems": TEAM_SIZE}
+
+TOOLS = [
+    {
+        "name": "get_pokemon_data",
+        "description": "Look up a Pokémon: types, abilities, base stats, first moves and evolution family.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "name": _NAME,
+                "fields": {"type": "array", "items": {"type": "string"}, "description": "Only return these fields"},
+            },
+            "required": ["name"],
+        },
+    },
+    {
+        "name": "simulate_battle",
+        "description": "Simulate a turn-based battle between two Pokémon using their real moves, stats and types.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"pokemon_1": _NAME, "pokemon_2": _NAME, "log": _LOG},
+            "required": ["pokemon_1", "pokemon_2"],
+        },
+    },
+    {
+        "name": "simulate_team_battle",
+        "description": f"Simulate a battle between two teams of 1 to {TEAM_SIZE} Pokémon, with switching.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"team_1": _TEAM, "team_2": _TEAM, "log": _LOG},
+            "required": ["team_1", "team_2"],
+        },
+    },
+    {
+        "name": "battle_odds",
+        "description": "Estimate win probabilities for a matchup by simulating many battles.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "pokemon_1": _NAME,
+                "pokemon_2": _NAME,
+                "n": {"type": "integer", "minimum": 1, "maximum": MAX_ODDS_BATTLES, "default": 10000},
+                "seed": {"type": "integer"},
+            },
+            "required": ["pokemon_1", "pokemon_2"],
+        },
+    },
+]
+
+
+def _name(args, key):
+    value = args.get(key)
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str) or not value.strip():
+        raise RPCError(INVALID_PARAMS, f"'{key}' must be a Pokémon name")
+    return value.strip().lower()
+
+
+def _team(args, key):
+    team = args.get(key)
+    if not isinstance(team, list) or not 1 <= len(team) <= TEAM_SIZE:
+        raise RPCError(INVALID_PARAMS, f"'{key}' must be a list of 1 to {TEAM_SIZE} Pokémon names")
+    return [_name({key: member}, key) for member in team]
+
+
+def _log(args):
+    log = args.get("log", "text")
+    if log not in LOG_MODES:
+        raise RPCError(INVALID_PARAMS, f"'log' must be one of {', '.join(LOG_MODES)}")
+    return log
+
+
+def _fields(fields):
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise RPCError(INVALID_PARAMS, str(e))
+
+
+def _int(value, key, low=None, high=None):
+    # Query-string values arrive as text.
+    if isinstance(value, str):
+        try:
+            value = int(value)
+        except ValueError:
+            pass
+    if not isinstance(value, int) or isinstance(value, bool) \
+            or (low is not None and value < low) or (high is not None and value > high):
+        bounds = f" from {low} to {high}" if low is not None and high is not None else ""
+        raise RPCError(INVALID_PARAMS, f"'{key}' must be an integer{bounds}")
+    return value
+
+
+async def _battle_odds(args):
+    pokemon_1, pokemon_2 = _name(args, "pokemon_1"), _name(args, "pokemon_2")
+    n = _int(args.get("n", 10000), "n", 1, MAX_ODDS_BATTLES)
+    seed = args.get("seed")
+    if seed is not None:
+        seed = _int(seed, "seed")
+    p1, p2 = await fetch_combatants(pokemon_1, pokemon_2)
+    if not p1 or not p2:
+        return await invalid_names(pokemon_1, pokemon_2)
+    from app.monte_carlo import battle_odds
+    return await asyncio.to_thread(battle_odds, p1, p2, n, seed)
+
+
+_TOOL_HANDLERS = {
+    "get_pokemon_data": lambda args: get_pokemon_data(_name(args, "name"), _fields(args.get("fields"))),
+    "simulate_battle": lambda args: simulate_battle(_name(args, "pokemon_1"), _name(args, "pokemon_2"), _log(args)),
+    "simulate_team_battle": lambda args: simulate_team_battle(_team(args, "team_1"), _team(args, "team_2"), _log(args)),
+    "battle_odds": _battle_odds,
+}
+
+
+async def initialize(params):
+    requested = params.get("protocolVersion")
+    return {
+        "protocolVersion": requested if requested in SUPPORTED_VERSIONS else PROTOCOL_VERSION,
+        "capabilities": {"resources": {}, "tools": {}},
+        "serverInfo": SERVER_INFO,
+        "instructions": "Read pokemon://{name} for Pokémon data; call simulate_battle or "
+                        "simulate_team_battle to run battles and battle_odds for win probabilities.",
+    }
+
+
+async def ping(params):
+    return {}
+
+
+async def list_resources(params):
+    return {"resources": []}
+
+
+async def list_resource_templates(params):
+    return {"resourceTemplates": RESOURCE_TEMPLATES}
+
+
+async def read_resource(params):
+    uri = params.get("uri")
+    if not isinstance(uri, str):
+        raise RPCError(INVALID_PARAMS, "'uri' must be a string")
+    parts = urlsplit(uri)
+    query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+    name = parts.netloc.lower()
+    if parts.scheme != "pokemon" or not name or parts.path not in ("", "/", "/moves"):
+        raise RPCError(RESOURCE_NOT_FOUND, "Resource not found", {"uri": uri})
+    try:
+        if parts.path == "/moves":
+            offset = _int(query.get("offset", 0), "offset", 0, 2 ** 31)
+            limit = _int(query.get("limit", 20), "limit", 1, 100)
+            data = await get_pokemon_moves(name, offset, limit)
+        else:
+            data = await get_pokemon_data(name, _fields(query.get("fields")))
+    except UpstreamError as e:
+        raise RPCError(INTERNAL_ERROR, "PokeAPI unavailable", {"detail": str(e), "retryAfter": e.retry_after})
+    if "error" in data:
+        raise RPCError(RESOURCE_NOT_FOUND, "Resource not found", {"uri": uri, **data})
+    return {"contents": [{"uri": uri, "mimeType": "application/json", "text": _json(data).decode()}]}
+
+
+async def list_tools(params):
+    return {"tools": TOOLS}
+
+
+async def call_tool(params):
+    handler = _TOOL_HANDLERS.get(params.get("name"))
+    if handler is None:
+        raise RPCError(INVALID_PARAMS, f"Unknown tool: {params.get('name')}")
+    args = params.get("arguments") or {}
+    if not isinstance(args, dict):
+        raise RPCError(INVALID_PARAMS, "'arguments' must be an object")
+    try:
+        result = await handler(args)
+    except UpstreamError as e:
+        # Tool failures are results the model can see, not protocol errors.
+        result = {"error": "PokeAPI unavailable", "detail": str(e)}
+    return {
+        "content": [{"type": "text", "text": _json(result).decode()}],
+        "isError": "error" in result,
+    }
+
+
+async def _ignore(params):
+    return None
+
+
+METHODS = {
+    "initialize": initialize,
+    "ping": ping,
+    "resources/list": list_resources,
+    "resources/templates/list": list_resource_templates,
+    "resources/read": read_resource,
+    "tools/list": list_tools,
+    "tools/call": call_tool,
+    "notifications/initialized": _ignore,
+    "notifications/cancelled": _ignore,
+}
+
+
+def _error(id, code, message, data=None):
+    error = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return {"jsonrpc": "2.0", "id": id, "error": error}
+
+
+async def handle(message):
+    # One JSON-RPC message -> its response, or None for notifications and
+    # for responses sent by the client (this server sends no requests).
+    if not isinstance(message, dict) or message.get("jsonrpc") != "2.0":
+        return _error(None, INVALID_REQUEST, "Invalid Request")
+    if "method" not in message:
+        return None
+    id = message.get("id")
+    notification = "id" not in message
+    try:
+        handler = METHODS.get(message["method"])
+        if handler is None:
+            raise RPCError(METHOD_NOT_FOUND, f"Method not found: {message['method']}")
+        params = message.get("params") or {}
+        if not isinstance(params, dict):
+            raise RPCError(INVALID_PARAMS, "'params' must be an object")
+        result = await handler(params)
+    except RPCError as e:
+        return None if notification else _error(id, e.code, str(e), e.data)
+    except Exception as e:
+        return None if notification else _error(id, INTERNAL_ERROR, "Internal error", {"detail": repr(e)})
+    return None if notification else {"jsonrpc": "2.0", "id": id, "result": result}
+
+
+async def handle_payload(payload):
+    # A message or a batch (list of messages) -> the response payload, or
+    # None if nothing needs an answer. A batch is admitted as one request, so
+    # it is capped at MCP_BATCH_MAX messages, run BATCH_CONCURRENCY at a time.
+    if isinstance(payload, list):
+        if not payload:
+            return _error(None, INVALID_REQUEST, "Empty batch")
+        if len(payload) > config.MCP_BATCH_MAX:
+            return _error(None, INVALID_REQUEST, f"At most {config.MCP_BATCH_MAX} messages per batch")
+        semaphore = asyncio.Semaphore(config.BATCH_CONCURRENCY)
+
+        async def run(message):
+            async with semaphore:
+                return await handle(message)
+
+        responses = [r for r in await asyncio.gather(*(run(m) for m in payload)) if r is not None]
+        return responses or None
+    return await handle(payload)
+
+
+async def handle_bytes(body):
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return _error(None, PARSE_ERROR, "Parse error")
+    return await handle_payload(payload)
+
+
+def origin_allowed(origin):
+    # Browsers send Origin; refusing foreign ones stops DNS-rebinding pages
+    # from driving a local server. Other clients send none.
+    if origin is None or "*" in config.MCP_ALLOWED_ORIGINS or origin in config.MCP_ALLOWED_ORIGINS:
+        return True
+    return urlsplit(origin).hostname in ("localhost", "127.0.0.1", "::1")
+
+
+async def serve_stdio(stdin=None, stdout=None):
+    # Newline-delimited JSON-RPC on stdin/stdout. Every line is handled in
+    # its own task and answered when done, so a slow call doesn't hold up
+    # the ones behind it. stdout carries nothing but protocol messages.
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    pending = set()
+
+    async def respond(line):
+        response = await handle_bytes(line)
+        if response is not None:
+            stdout.write(_json(response) + b"\n")
+            stdout.flush()
+
+    shared_cache.open_backend()
+    warmup.start()
+    try:
+        while True:
+            line = await asyncio.to_thread(stdin.readline)
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.ensure_future(respond(line))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        warmup.stop()
+        await http_client.close()
+        await shared_cache.close()
+
+
+def main():
+    asyncio.run(serve_stdio())
+
+
+if __name__ == "__main__":
+    main()
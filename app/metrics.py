@@ -0,0 +1,156 @@
+import time
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.routing import Match
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request, including streaming the response.",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled.",
+    ["route"],
+)
+
+UPSTREAM_REQUESTS = Counter(
+    "pokeapi_requests_total",
+    "Upstream PokeAPI calls by resource kind and HTTP status ('error' if no response).",
+    ["kind", "status"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "pokeapi_request_duration_seconds",
+    "Upstream PokeAPI call latency, including retries.",
+    ["kind"],
+)
+UPSTREAM_CIRCUIT_OPEN = Gauge(
+    "pokeapi_circuit_open",
+    "1 while the upstream circuit breaker is open or half-open, else 0.",
+)
+
+UPSTREAM_IN_FLIGHT = Gauge(
+    "pokeapi_in_flight",
+    "Upstream PokeAPI calls holding a concurrency slot.",
+)
+UPSTREAM_QUEUE_DEPTH = Gauge(
+    "pokeapi_queue_depth",
+    "Upstream PokeAPI calls waiting for a concurrency slot.",
+)
+UPSTREAM_QUEUE_WAIT = Histogram(
+    "pokeapi_queue_wait_seconds",
+    "Time upstream PokeAPI calls waited for a concurrency slot.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+UPSTREAM_REJECTED = Counter(
+    "pokeapi_rejected_total",
+    "Upstream PokeAPI calls refused because the wait queue was full or the wait timed out.",
+    ["reason"],
+)
+ADMISSION_REJECTED = Counter(
+    "http_requests_rejected_total",
+    "Requests refused by admission control ('rate_limited' -> 429, 'overloaded' -> 503).",
+    ["reason"],
+)
+
+SHARED_CACHE_REQUESTS = Counter(
+    "shared_cache_requests_total",
+    "Shared (cross-worker) cache calls by operation and result.",
+    ["op", "result"],
+)
+
+BATTLE_TURNS = Histogram(
+    "battle_turns",
+    "Turns per simulated battle.",
+    ["engine"],
+    buckets=(5, 10, 15, 20, 30, 50, 100, 250, 1000),
+)
+BATTLE_DURATION = Histogram(
+    "battle_duration_seconds",
+    "Wall-clock time spent in the battle engine per call.",
+    ["engine"],
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005, 0.025, 0.1, 0.5),
+)
+
+
+def observe_upstream(kind, status, seconds):
+    UPSTREAM_REQUESTS.labels(kind, str(status)).inc()
+    UPSTREAM_LATENCY.labels(kind).observe(seconds)
+
+
+def observe_battle(engine, turns, seconds):
+    if turns is not None:
+        BATTLE_TURNS.labels(engine).observe(turns)
+    BATTLE_DURATION.labels(engine).observe(seconds)
+
+
+class CacheCollector:
+    # Exposes TTLCache.stats() at scrape time rather than on every lookup,
+    # one series per registered cache.
+    def __init__(self):
+        self.caches = {}
+
+    def collect(self):
+        size = GaugeMetricFamily("cache_entries", "Entries currently cached.", labels=["cache"])
+        counters = {
+            key: CounterMetricFamily(f"cache_{key}", f"Cache {key}.", labels=["cache"])
+            for key in ("hits", "misses", "evictions", "coalesced", "stale")
+        }
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            size.add_metric([name], stats["size"])
+            for key, counter in counters.items():
+                counter.add_metric([name], stats[key])
+        yield size
+        yield from counters.values()
+
+
+CACHES = CacheCollector()
+REGISTRY.register(CACHES)
+
+
+def register_cache(name, cache):
+    CACHES.caches[name] = cache
+
+
+def render():
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware so streaming responses are timed to their last
+    # byte. Requests are labelled by route template, not raw path, to keep
+    # label cardinality bounded.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = _route_template(scope)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(time.perf_counter() - start)
+            in_flight.dec()
+
+
+def _route_template(scope):
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
@@ -0,0 +1,162 @@
+from app.type_chart import NO_TYPE, TYPE_IDS, type_ids
+
+# Upstream stat names, in PokeAPI order.
+STAT_NAMES = ("hp", "attack", "defense", "special-attack", "special-defense", "speed")
+
+
+class Pokemon:
+    # Everything the app reads from a /pokemon/{name} document, parsed once.
+    # Instances are shared through the entity cache and must not be mutated;
+    # battles keep their own HP and status. `attacks` is filled in once by
+    # pokeapi.fetch_attacks with the learnset's damaging moves.
+    __slots__ = (
+        "id", "name", "types", "type_ids", "abilities", "moves", "attacks",
+        "hp", "attack", "defense", "special_attack", "special_defense", "speed",
+    )
+
+    def __init__(self, id, name, types, abilities, moves, stats):
+        self.id = id
+        self.name = name
+        self.types = tuple(types)
+        self.type_ids = type_ids(self.types)
+        self.abilities = tuple(abilities)
+        self.moves = tuple(moves)
+        self.attacks = None
+        (self.hp, self.attack, self.defense,
+         self.special_attack, self.special_defense, self.speed) = (stats.get(s, 0) for s in STAT_NAMES)
+
+    @classmethod
+    def from_api(cls, doc):
+        return cls(
+            id=doc["id"],
+            name=doc["name"],
+            types=[t["type"]["name"] for t in sorted(doc["types"], key=lambda t: t["slot"])],
+            abilities=[a["ability"]["name"] for a in doc["abilities"]],
+            moves=[m["move"]["name"] for m in doc["moves"]],
+            stats={s["stat"]["name"]: s["base_stat"] for s in doc["stats"]},
+        )
+
+    @property
+    def type(self):
+        # The primary type, which battle moves are assumed to have.
+        return self.types[0]
+
+    @property
+    def stats(self):
+        return {
+            "hp": self.hp,
+            "attack": self.attack,
+            "defense": self.defense,
+            "special-attack": self.special_attack,
+            "special-defense": self.special_defense,
+            "speed": self.speed,
+        }
+
+    def summary(self):
+        # Battle-relevant fields as plain JSON, e.g. for tournament metadata.
+        return {
+            "name": self.name,
+            "types": list(self.types),
+            "hp": self.hp,
+            "attack": self.attack,
+            "defense": self.defense,
+            "speed": self.speed,
+        }
+
+    def __repr__(self):
+        return f"Pokemon({self.name!r}, types={self.types}, hp={self.hp})"
+
+
+# Catalog fields reported for each move, besides its name.
+MOVE_FIELDS = ("type", "power", "accuracy", "pp", "priority", "damage_class")
+
+
+class Move:
+    # One entry of the move catalog. power and accuracy are None for moves
+    # without them (status moves, fixed-damage moves, moves that never miss).
+    __slots__ = ("id", "name", "type", "type_id", "power", "accuracy", "pp", "priority", "damage_class")
+
+    def __init__(self, id, name, type, power, accuracy, pp, priority, damage_class):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.type_id = TYPE_IDS.get(type, NO_TYPE)
+        self.power = power
+        self.accuracy = accuracy
+        self.pp = pp
+        self.priority = priority
+        self.damage_class = damage_class
+
+    @classmethod
+    def from_api(cls, doc):
+        return cls(
+            id=doc["id"],
+            name=doc["name"],
+            type=doc["type"]["name"],
+            power=doc.get("power"),
+            accuracy=doc.get("accuracy"),
+            pp=doc.get("pp"),
+            priority=doc.get("priority", 0),
+            damage_class=(doc.get("damage_class") or {}).get("name"),
+        )
+
+    @property
+    def physical(self):
+        return self.damage_class == "physical"
+
+    def summary(self):
+        return {"name": self.name, **{field: getattr(self, field) for field in MOVE_FIELDS}}
+
+    def __repr__(self):
+        return f"Move({self.name!r}, {self.type}, power={self.power})"
+
+
+def resource_id(url):
+    # "https://pokeapi.co/api/v2/pokemon-species/133/" -> 133
+    return int(url.rstrip("/").rsplit("/", 1)[-1])
+
+
+def _conditions(details):
+    # Upstream evolution_details list every possible condition, mostly null;
+    # keep the ones that are set, with named resources reduced to names.
+    conditions = []
+    for detail in details:
+        condition = {}
+        for key, value in detail.items():
+            if value is None or value == "" or value is False:
+                continue
+            condition[key] = value["name"] if isinstance(value, dict) else value
+        conditions.append(condition)
+    return conditions
+
+
+class EvolutionChain:
+    # A parsed evolution-chain document. `tree` is nested
+    # {"species", "conditions", "evolves_to"} nodes covering every branch;
+    # `species` lists the family in depth-first order; `members` pairs each
+    # species name with its id. Shared through the chain cache; read-only.
+    __slots__ = ("id", "tree", "species", "members")
+
+    def __init__(self, id, tree, members):
+        self.id = id
+        self.tree = tree
+        self.members = tuple(members)
+        self.species = tuple(name for name, _ in self.members)
+
+    @classmethod
+    def from_api(cls, doc):
+        members = []
+
+        def node(link):
+            species = link["species"]
+            members.append((species["name"], resource_id(species["url"])))
+            return {
+                "species": species["name"],
+                "conditions": _conditions(link.get("evolution_details", ())),
+                "evolves_to": [node(child) for child in link.get("evolves_to", ())],
+            }
+
+        return cls(doc["id"], node(doc["chain"]), members)
+
+    def __repr__(self):
+        return f"EvolutionChain({self.id}, species={self.species})"
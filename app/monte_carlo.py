@@ -0,0 +1,143 @@
+import math
+import time
+import numpy as np
+from app import metrics, profiling
+from app.battle_simulator import BURN, MAX_ROUNDS, PARALYSIS, POISON, STAB
+from app.type_chart import batch_multipliers
+
+
+def _move_arrays(attacker, defender):
+    # battle_simulator.move_table as parallel arrays, or None without move
+    # data, with every move's type multiplier taken from the table in one
+    # batched lookup. Moves that never miss get infinite accuracy.
+    attacks = attacker.attacks
+    if not attacks:
+        return None
+    type_ids = np.array([m.type_id for m in attacks])
+    stab = np.where(np.isin(type_ids, attacker.type_ids), STAB, 1.0)
+    multiplier = batch_multipliers(type_ids, np.broadcast_to(defender.type_ids, (len(attacks), 2))) * stab
+    return (
+        np.array([m.power for m in attacks], dtype=np.int64),
+        np.array([np.inf if m.accuracy is None else m.accuracy for m in attacks]),
+        np.array([m.physical for m in attacks], dtype=bool),
+        multiplier,
+    )
+
+
+def simulate_many(p1, p2, n, seed=None):
+    # Runs n independent battles of the same matchup in lock-step with the
+    # rules of battle_simulator.run_battle. Side 0 is whoever moves first.
+    # Returns per-battle winner (0 draw, 1 p1, 2 p2) and turn counts.
+    rng = np.random.default_rng(seed)
+    p1_first = p1.speed >= p2.speed
+    sides = (p1, p2) if p1_first else (p2, p1)
+
+    attack = [s.attack for s in sides]
+    defense = [s.defense for s in sides]
+    special_attack = [s.special_attack for s in sides]
+    special_defense = [s.special_defense for s in sides]
+    # Without move data each side attacks with its primary type.
+    multiplier = batch_multipliers(
+        [sides[0].type_ids[0], sides[1].type_ids[0]], [sides[1].type_ids, sides[0].type_ids]
+    ).tolist()
+    move_arrays = [_move_arrays(sides[0], sides[1]), _move_arrays(sides[1], sides[0])]
+
+    hp = np.empty((2, n), dtype=np.int64)
+    hp[0] = sides[0].hp
+    hp[1] = sides[1].hp
+    status = np.zeros((2, n), dtype=np.int8)
+    turns = np.zeros(n, dtype=np.int32)
+    active = np.arange(n)
+
+    for rnd in range(MAX_ROUNDS):
+        # Whoever moved second last round moves first this round.
+        order = ((0, 1), (1, 0)) if rnd % 2 == 0 else ((1, 0), (0, 1))
+        for a, d in order:
+            active = active[(hp[0, active] > 0) & (hp[1, active] > 0)]
+            if active.size == 0:
+                break
+            turns[active] += 1
+
+            paralyzed = (status[a, active] == PARALYSIS) & (rng.random(active.size) < 0.25)
+            acting = active[~paralyzed]
+            k = acting.size
+
+            if move_arrays[a] is None:
+                move_power = rng.integers(40, 101, k)
+                move_multiplier = multiplier[a]
+                physical = True
+                attack_stat, defense_stat = attack[a], defense[d]
+            else:
+                power, accuracy, is_physical, move_multipliers = move_arrays[a]
+                chosen_move = rng.integers(0, power.size, k)
+                hit = rng.random(k) * 100 < accuracy[chosen_move]
+                acting, chosen_move = acting[hit], chosen_move[hit]
+                k = acting.size
+                move_power = power[chosen_move]
+                move_multiplier = move_multipliers[chosen_move]
+                physical = is_physical[chosen_move]
+                attack_stat = np.where(physical, attack[a], special_attack[a])
+                defense_stat = np.where(physical, defense[d], special_defense[d])
+            burned = physical & (status[a, acting] == BURN)
+            effective_attack = np.where(burned, attack_stat // 2, attack_stat)
+            damage = (((2 * effective_attack / defense_stat) * move_power) / 50 + 2) * move_multiplier
+            hp[d, acting] -= damage.astype(np.int64)
+
+            poisoned = acting[status[d, acting] == POISON]
+            hp[d, poisoned] -= (hp[d, poisoned] * 0.05).astype(np.int64)
+
+            inflict = (status[d, acting] == 0) & (rng.random(k) < 0.2)
+            chosen = rng.integers(1, 4, k).astype(np.int8)
+            status[d, acting[inflict]] = chosen[inflict]
+        if active.size == 0:
+            break
+
+    first, second = (1, 2) if p1_first else (2, 1)
+    winner = np.zeros(n, dtype=np.int8)
+    winner[hp[1] <= 0] = first
+    winner[hp[0] <= 0] = second
+    return winner, turns
+
+
+def wilson_interval(successes, n, z=1.96):
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def battle_odds(p1, p2, n=10000, seed=None):
+    start = time.perf_counter()
+    with profiling.phase("battle"):
+        winner, turns = simulate_many(p1, p2, n, seed)
+    metrics.observe_battle("vectorized", None, time.perf_counter() - start)
+    counts = np.bincount(winner, minlength=3)
+    histogram = np.bincount(turns)
+    p50, p90, p99 = np.percentile(turns, [50, 90, 99])
+    return {
+        "pokemon_1": p1.name,
+        "pokemon_2": p2.name,
+        "battles": n,
+        "seed": seed,
+        "win_probability": {
+            "pokemon_1": float(counts[1] / n),
+            "pokemon_2": float(counts[2] / n),
+            "draw": float(counts[0] / n),
+        },
+        "confidence_interval_95": {
+            "pokemon_1": wilson_interval(int(counts[1]), n),
+            "pokemon_2": wilson_interval(int(counts[2]), n),
+        },
+        "turns": {
+            "mean": float(turns.mean()),
+            "min": int(turns.min()),
+            "max": int(turns.max()),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "histogram": {int(t): int(c) for t, c in enumerate(histogram) if c},
+        },
+    }
@@ -0,0 +1,116 @@
+import asyncio
+import difflib
+import re
+import time
+from bisect import bisect_left
+from app import config, metrics
+from app.cache import TTLCache
+from app.pokeapi import UpstreamError, fetch_names
+
+# Pokémon and species names, kept sorted so prefix search is a bisect.
+# Names the index doesn't know are rejected (or corrected, when one close
+# match is near-certain) without asking PokeAPI. Until the index has been
+# built, or if it can't be, names pass through unchanged.
+
+KINDS = ("pokemon", "pokemon-species")
+# A fuzzy match at least this close replaces an unknown name outright.
+AUTOCORRECT_RATIO = 0.9
+# After a failed build, names pass through for this long before retrying.
+RETRY_AFTER = 60.0
+
+_cache = TTLCache(maxsize=1, ttl=config.POKEAPI_CACHE_TTL)
+metrics.register_cache("name_index", _cache)
+_failed_at = None
+
+
+def normalize(name):
+    # "Mr. Mime" -> "mr-mime", "Farfetch'd" -> "farfetchd", "Nidoran♀" -> "nidoran-f"
+    name = name.strip().lower().replace("♀", "-f").replace("♂", "-m")
+    name = re.sub(r"['’]", "", name)
+    return re.sub(r"[\s_.]+", "-", name).strip("-")
+
+
+class NameIndex:
+    __slots__ = ("names", "_set")
+
+    def __init__(self, names):
+        self.names = sorted(set(names))
+        self._set = frozenset(self.names)
+
+    def __contains__(self, name):
+        return name in self._set
+
+    def __len__(self):
+        return len(self.names)
+
+    def prefix(self, prefix, limit=10):
+        start = bisect_left(self.names, prefix)
+        matches = []
+        for name in self.names[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            matches.append(name)
+        return matches
+
+    def fuzzy(self, name, limit=5, cutoff=0.6):
+        return difflib.get_close_matches(name, self.names, n=limit, cutoff=cutoff)
+
+    def resolve(self, name):
+        # (canonical name or None, suggestions)
+        if name in self._set:
+            return name, []
+        normalized = normalize(name)
+        if normalized in self._set:
+            return normalized, []
+        suggestions = self.fuzzy(normalized)
+        if suggestions:
+            best = difflib.SequenceMatcher(None, normalized, suggestions[0]).ratio()
+            runner_up = (
+                difflib.SequenceMatcher(None, normalized, suggestions[1]).ratio()
+                if len(suggestions) > 1 else 0.0
+            )
+            if best >= AUTOCORRECT_RATIO and best > runner_up:
+                return suggestions[0], []
+        return None, suggestions
+
+
+async def _build():
+    global _failed_at
+    try:
+        lists = await asyncio.gather(*(fetch_names(kind) for kind in KINDS))
+    except UpstreamError:
+        lists = [None]
+    if any(not names for names in lists):
+        _failed_at = time.monotonic()
+        return None
+    _failed_at = None
+    return NameIndex(name for names in lists for name in names)
+
+
+async def get_index():
+    # None if the name lists couldn't be loaded.
+    if _failed_at is not None and time.monotonic() - _failed_at < RETRY_AFTER:
+        return None
+    return await _cache.get_or_load("names", _build)
+
+
+async def resolve(name):
+    # (name to look up, suggestions). The name is None when the index rules
+    # it out; ids and names seen while the index is unavailable pass through.
+    if name.isdigit():
+        return name, []
+    index = await get_index()
+    if index is None:
+        return name, []
+    return index.resolve(name)
+
+
+async def search(query, limit=10):
+    index = await get_index()
+    if index is None:
+        return None
+    query = normalize(query)
+    matches = index.prefix(query, limit) if query else []
+    if len(matches) < limit and query:
+        matches += [m for m in index.fuzzy(query, limit) if m not in matches][:limit - len(matches)]
+    return matches
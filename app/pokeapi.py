@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+import httpx
+from app import config, http_client, local_store, metrics, profiling, shared_cache
+from app.cache import TTLCache
+from app.models import EvolutionChain, Move, Pokemon, resource_id
+
+
+class UpstreamError(Exception):
+    # PokeAPI failed or the circuit breaker is open. Unlike a 404 (None),
+    # this says nothing about whether the resource exists.
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Documents and entities below are served stale for POKEAPI_STALE_TTL after
+# they expire while a background refresh runs, so an upstream incident only
+# affects resources that were never cached.
+cache = TTLCache(maxsize=config.POKEAPI_CACHE_SIZE, ttl=config.POKEAPI_CACHE_TTL, stale_ttl=config.POKEAPI_STALE_TTL)
+metrics.register_cache("pokeapi", cache)
+# Paths PokeAPI answered 404 for, so repeating an unknown name doesn't cost
+# another round trip. Transport errors and 5xx are not remembered.
+missing = TTLCache(maxsize=config.POKEAPI_CACHE_SIZE, ttl=config.NEGATIVE_CACHE_TTL)
+metrics.register_cache("missing", missing)
+# Parsed Pokemon entities. Pokemon documents go only here, not into `cache`,
+# so each one is downloaded and decoded once and the bulky raw JSON (mostly
+# the moves list) is dropped as soon as the entity is built.
+entities = TTLCache(maxsize=config.POKEAPI_CACHE_SIZE, ttl=config.POKEAPI_CACHE_TTL, stale_ttl=config.POKEAPI_STALE_TTL)
+metrics.register_cache("pokemon", entities)
+# Parsed evolution chains by chain id, and species name/id -> chain id. Each
+# loaded chain indexes all of its species, so looking up any other member of
+# the family skips both the species and the chain fetch.
+chains = TTLCache(maxsize=config.POKEAPI_CACHE_SIZE, ttl=config.POKEAPI_CACHE_TTL, stale_ttl=config.POKEAPI_STALE_TTL)
+metrics.register_cache("evolution_chain", chains)
+species_chains = TTLCache(maxsize=config.POKEAPI_CACHE_SIZE * 4, ttl=config.POKEAPI_CACHE_TTL)
+metrics.register_cache("species_chain", species_chains)
+# The move catalog, by move name. It is loaded in one pass at startup (see
+# load_move_catalog), from the local store when there is one, otherwise from
+# PokeAPI; moves still missing are fetched once each. Lookups are O(1), so
+# battles can resolve learnsets on every request.
+moves = TTLCache(maxsize=config.POKEAPI_CACHE_SIZE, ttl=config.POKEAPI_CACHE_TTL, stale_ttl=config.POKEAPI_STALE_TTL)
+metrics.register_cache("move", moves)
+_moves_seeded = False
+_seed_lock = threading.Lock()
+
+
+def api_path(url):
+    # "https://pokeapi.co/api/v2/evolution-chain/1/" -> "evolution-chain/1"
+    return url.split("/api/v2/", 1)[-1].strip("/")
+
+
+async def _load(path):
+    if config.DATA_SOURCE != "live":
+        with profiling.phase("local_store"):
+            doc = local_store.lookup(path)
+        if doc is not None or config.DATA_SOURCE == "local":
+            return doc
+    if missing.get(path):
+        return None
+    with profiling.phase("shared_cache"):
+        found, doc = await shared_cache.get(path)
+    if found:
+        if doc is None:
+            missing.set(path, True)
+        return doc
+    # Every upstream PokeAPI read in the app passes through here.
+    kind = path.split("/", 1)[0].split("?", 1)[0]
+    start = time.perf_counter()
+    try:
+        with profiling.phase("network"):
+            res = await http_client.get(f"{config.POKEAPI_BASE}/{path}")
+    except http_client.CircuitOpenError as e:
+        raise UpstreamError("PokeAPI is unavailable (circuit open)", e.retry_after) from e
+    except http_client.UpstreamBusyError as e:
+        raise UpstreamError(f"PokeAPI request queue is busy ({e.reason})", e.retry_after) from e
+    except httpx.HTTPError as e:
+        metrics.observe_upstream(kind, "error", time.perf_counter() - start)
+        raise UpstreamError(f"PokeAPI request failed: {e!r}") from e
+    metrics.observe_upstream(kind, res.status_code, time.perf_counter() - start)
+    if res.status_code == 404:
+        missing.set(path, True)
+        await shared_cache.put(path, None, config.NEGATIVE_CACHE_TTL)
+    if res.status_code in http_client.RETRY_STATUSES:
+        raise UpstreamError(f"PokeAPI returned HTTP {res.status_code}")
+    if res.status_code != 200:
+        return None
+    with profiling.phase("json_decode"):
+        doc = res.json()
+    if shared_cache.get_backend() is not None:
+        # Shared entries keep only the fields the app reads; listings are
+        # kept whole. A worker that picks one up late caches it for its own
+        # full TTL, so a document can be up to 2 x POKEAPI_CACHE_TTL old.
+        if "/" in path:
+            doc = local_store.compact(kind, doc)
+        await shared_cache.put(path, doc, config.POKEAPI_CACHE_TTL)
+    return doc
+
+
+async def fetch_json(path):
+    return await cache.get_or_load(path, lambda: _load(path))
+
+
+async def _load_pokemon(name):
+    doc = await _load(f"pokemon/{name}")
+    if doc is None:
+        return None
+    with profiling.phase("build"):
+        return Pokemon.from_api(doc)
+
+
+async def fetch_pokemon(name):
+    return await entities.get_or_load(name, lambda: _load_pokemon(name))
+
+
+async def _load_chain(chain_id):
+    doc = await _load(f"evolution-chain/{chain_id}")
+    if doc is None:
+        return None
+    with profiling.phase("build"):
+        chain = EvolutionChain.from_api(doc)
+    for name, species_id in chain.members:
+        species_chains.set(name, chain.id)
+        species_chains.set(str(species_id), chain.id)
+    return chain
+
+
+async def fetch_evolution_chain(chain_id):
+    return await chains.get_or_load(chain_id, lambda: _load_chain(chain_id))
+
+
+async def fetch_species_chain(species):
+    # (found, chain) for a species name or id. found is False if the species
+    # doesn't exist; chain is None if its evolution chain couldn't be loaded.
+    chain_id = species_chains.get(species)
+    if chain_id is None:
+        doc = await fetch_json(f"pokemon-species/{species}")
+        if doc is None:
+            return False, None
+        if not doc.get("evolution_chain"):
+            return True, None
+        chain_id = resource_id(doc["evolution_chain"]["url"])
+        species_chains.set(species, chain_id)
+    return True, await fetch_evolution_chain(chain_id)
+
+
+def seed_moves():
+    global _moves_seeded
+    if _moves_seeded or config.DATA_SOURCE == "live":
+        return
+    with _seed_lock:
+        if _moves_seeded:
+            return
+        store = local_store.get_store()
+        if store is not None:
+            for doc in store.documents("move"):
+                moves.set(doc["name"], Move.from_api(doc), ttl=float("inf"))
+        _moves_seeded = True
+
+
+async def _load_move(name):
+    doc = await _load(f"move/{name}")
+    return None if doc is None else Move.from_api(doc)
+
+
+async def fetch_move(name):
+    return await moves.get_or_load(name, lambda: _load_move(name))
+
+
+async def _fetch_moves(names, concurrency=None):
+    # Moves not yet cached are fetched at most `concurrency`
+    # (MOVE_FETCH_CONCURRENCY) at a time. Failures are returned, not raised.
+    semaphore = asyncio.Semaphore(concurrency or config.MOVE_FETCH_CONCURRENCY)
+
+    async def fetch(name):
+        async with semaphore:
+            return await fetch_move(name)
+
+    return await asyncio.gather(*(fetch(name) for name in names), return_exceptions=True)
+
+
+async def load_move_catalog(concurrency=None):
+    # Fills the move catalog in one pass: from the local store when there is
+    # one, then every move PokeAPI lists that isn't cached yet. Returns
+    # (moves, failed); moves that failed are fetched again when a learnset
+    # needs them.
+    seed_moves()
+    if config.DATA_SOURCE == "local":
+        return len(moves.keys()), 0
+    try:
+        names = await fetch_names("move") or []
+    except UpstreamError:
+        if config.DATA_SOURCE == "live":
+            raise
+        # The store's moves are seeded; the rest load when a learnset needs them.
+        return len(moves.keys()), 0
+    loaded = await _fetch_moves(names, concurrency)
+    return len(names), sum(isinstance(m, Exception) for m in loaded)
+
+
+async def fetch_attacks(pokemon, concurrency=None):
+    # The learnset's damaging moves (those with a base power), resolved once
+    # per entity. Empty if no move data is available. Raises UpstreamError if
+    # any move couldn't be loaded, rather than battling on part of the
+    # learnset; the moves that did load stay cached for the next attempt.
+    if pokemon.attacks is not None:
+        return pokemon.attacks
+    seed_moves()
+    learnset = await _fetch_moves(pokemon.moves, concurrency)
+    failed = [e for e in learnset if isinstance(e, Exception)]
+    if failed:
+        if not all(isinstance(e, UpstreamError) for e in failed):
+            raise next(e for e in failed if not isinstance(e, UpstreamError))
+        retry_after = max((e.retry_after for e in failed if e.retry_after is not None), default=None)
+        raise UpstreamError(
+            f"Couldn't load {len(failed)} of {len(learnset)} moves of {pokemon.name}: {failed[0]}", retry_after
+        ) from failed[0]
+    pokemon.attacks = tuple(m for m in learnset if isinstance(m, Move) and m.power)
+    return pokemon.attacks
+
+
+async def fetch_names(kind):
+    # Every name of one kind. In local mode that is what the store holds. In
+    # local_fallback the store may be partial (an import with --limit, or
+    # species added upstream since), so its names are merged with the
+    # upstream listing; if that listing fails, so does this.
+    stored = []
+    if config.DATA_SOURCE != "live":
+        store = local_store.get_store()
+        if store is not None:
+            stored = [path.split("/", 1)[1] for path in store.paths(kind)]
+            if config.DATA_SOURCE == "local":
+                return stored
+    listing = await _load(f"{kind}?limit=100000&offset=0")
+    if listing is None:
+        return stored or None
+    return list(dict.fromkeys(stored + [item["name"] for item in listing["results"]]))
@@ -0,0 +1,125 @@
+import contextvars
+import cProfile
+import io
+import pstats
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+
+# Opt-in per-request profiling. With PROFILING_ENABLED set, a request sent
+# with "X-Profile: 1" (or ?profile=1) gets a Server-Timing header with the
+# wall-clock time it spent in each phase (phases of different kinds may
+# overlap); "X-Profile: cprofile" also runs it under cProfile.
+# Recent profiles are kept for GET /debug/profiles. When profiling is off the
+# middleware is not installed and phase() returns a shared no-op context.
+
+_current = contextvars.ContextVar("profile", default=None)
+_NULL = nullcontext()
+
+recent = deque(maxlen=100)
+
+
+class _Timings(dict):
+    # Phase name -> seconds during which at least one call was in that phase,
+    # so concurrent fetches count once, as wall-clock time, not once each.
+    __slots__ = ("_open",)
+
+    def __init__(self):
+        super().__init__()
+        self._open = {}  # name -> [calls in progress, when the first began]
+
+    def enter(self, name):
+        span = self._open.setdefault(name, [0, 0.0])
+        if not span[0]:
+            span[1] = time.perf_counter()
+        span[0] += 1
+
+    def exit(self, name):
+        span = self._open[name]
+        span[0] -= 1
+        if not span[0]:
+            self[name] = self.get(name, 0.0) + time.perf_counter() - span[1]
+
+
+class _Phase:
+    __slots__ = ("timings", "name")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.timings.enter(self.name)
+
+    def __exit__(self, *exc):
+        self.timings.exit(self.name)
+
+
+def phase(name):
+    timings = _current.get()
+    if timings is None:
+        return _NULL
+    return _Phase(timings, name)
+
+
+def _requested_mode(scope):
+    for key, value in scope["headers"]:
+        if key == b"x-profile":
+            return value.decode().lower()
+    for pair in scope.get("query_string", b"").decode().split("&"):
+        key, _, value = pair.partition("=")
+        if key == "profile":
+            return value.lower() or "1"
+    return None
+
+
+def server_timing(timings):
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items())
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        mode = _requested_mode(scope) if scope["type"] == "http" else None
+        if mode not in ("1", "true", "cprofile"):
+            await self.app(scope, receive, send)
+            return
+
+        timings = _Timings()
+        token = _current.set(timings)
+        profile_id = uuid.uuid4().hex[:12]
+        profiler = cProfile.Profile() if mode == "cprofile" else None
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                report = dict(timings, total=time.perf_counter() - start)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(report).encode()))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        if profiler is not None:
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            _current.reset(token)
+            record = {
+                "id": profile_id,
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode(),
+                "total_ms": round((time.perf_counter() - start) * 1000, 3),
+                "phases_ms": {name: round(s * 1000, 3) for name, s in timings.items()},
+            }
+            if profiler is not None:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+                record["cprofile"] = out.getvalue()
+            recent.append(record)
@@ -4,6 +4,11 @@ import requests
 import random
 import json
 from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+# Streamlit puts this script's directory on sys.path, so the backend's
+# shared type chart imports as a top-level module.
+from type_chart import get_type_multiplier
 
 # Configuration
 st.set_page_config(
@@ -55,30 +60,68 @@ st.markdown("""
 STATUS_EFFECTS = ['paralysis', 'burn', 'poison']
 POKEAPI_BASE = "https://pokeapi.co/api/v2"
 
+DATA_TTL = 6 * 3600
+IMAGE_TTL = 24 * 3600
+ARTWORK_URL = "https://img.pokemondb.net/artwork/{}.jpg"
+
+@st.cache_resource
+def get_session():
+    # One pooled session per server process, shared by every rerun and user.
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.2, status_forcelist=(429, 502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def fetch_json(url):
+    # PokeAPI documents by URL. A 404 is a real answer and is cached as None;
+    # anything else raises so transient failures aren't cached.
+    res = get_session().get(url, timeout=10)
+    if res.status_code == 404:
+        return None
+    res.raise_for_status()
+    return res.json()
+
+@st.cache_data(ttl=IMAGE_TTL, show_spinner=False)
+def _fetch_artwork(name):
+    res = get_session().get(ARTWORK_URL.format(name), timeout=10)
+    res.raise_for_status()
+    return res.content
+
+def get_artwork(name):
+    # Image bytes, or None if the artwork can't be fetched.
+    try:
+        return _fetch_artwork(name)
+    except requests.exceptions.RequestException:
+        return None
+
 def fetch_pokemon_stats(name):
+    # Shares the cached /pokemon/{name} document with get_pokemon_data, so
+    # pressing "Battle" after the preview makes no further requests.
     try:
-        res = requests.get(f"{POKEAPI_BASE}/pokemon/{name}")
-        if res.status_code != 200:
+        data = fetch_json(f"{POKEAPI_BASE}/pokemon/{name}")
+        if data is None:
             return None
-        data = res.json()
         return {
             "name": name,
             "hp": next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'hp'),
             "attack": next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'attack'),
             "defense": next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'defense'),
             "speed": next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'speed'),
-            "type": data['types'][0]['type']['name']
+            "type": data['types'][0]['type']['name'],
+            "types": [t['type']['name'] for t in data['types']]
         }
     except:
         return None
 
 def get_evolution_chain(url):
     try:
-        res = requests.get(url)
-        if res.status_code != 200:
+        data = fetch_json(url)
+        if data is None:
             return {}
 
-        chain = res.json()['chain']
+        chain = data['chain']
         evolution = []
         while chain:
             evolution.append(chain['species']['name'])
@@ -90,46 +133,17 @@ def get_evolution_chain(url):
     except:
         return []
 
-def get_type_multiplier(attack_type, defense_type):
-    chart = {
-        'fire': {'grass': 2, 'water': 0.5, 'fire': 0.5},
-        'water': {'fire': 2, 'grass': 0.5, 'water': 0.5},
-        'grass': {'water': 2, 'fire': 0.5, 'grass': 0.5},
-        'electric': {'water': 2, 'flying': 2, 'grass': 0.5, 'ground': 0},
-        'normal': {'rock': 0.5, 'ghost': 0},
-        'fighting': {'normal': 2, 'rock': 2, 'ice': 2, 'dark': 2, 'steel': 2, 
-                     'flying': 0.5, 'poison': 0.5, 'bug': 0.5, 'psychic': 0.5, 'ghost': 0},
-        'flying': {'grass': 2, 'fighting': 2, 'bug': 2, 'electric': 0.5, 'rock': 0.5, 'steel': 0.5},
-        'poison': {'grass': 2, 'fairy': 2, 'poison': 0.5, 'ground': 0.5, 'rock': 0.5, 'ghost': 0.5},
-        'ground': {'fire': 2, 'electric': 2, 'poison': 2, 'rock': 2, 'steel': 2, 
-                   'grass': 0.5, 'bug': 0.5, 'flying': 0},
-        'rock': {'fire': 2, 'ice': 2, 'flying': 2, 'bug': 2, 'fighting': 0.5, 'ground': 0.5, 'steel': 0.5},
-        'bug': {'grass': 2, 'psychic': 2, 'dark': 2, 'fire': 0.5, 'fighting': 0.5, 'poison': 0.5, 
-                'flying': 0.5, 'ghost': 0.5, 'steel': 0.5},
-        'ghost': {'ghost': 2, 'psychic': 2, 'normal': 0, 'dark': 0.5},
-        'steel': {'ice': 2, 'rock': 2, 'fairy': 2, 'fire': 0.5, 'water': 0.5, 'electric': 0.5, 'steel': 0.5},
-        'psychic': {'fighting': 2, 'poison': 2, 'dark': 0, 'steel': 0.5, 'psychic': 0.5},
-        'ice': {'grass': 2, 'ground': 2, 'flying': 2, 'dragon': 2, 'fire': 0.5, 'water': 0.5, 'ice': 0.5, 'steel': 0.5},
-        'dragon': {'dragon': 2, 'steel': 0.5, 'fairy': 0},
-        'dark': {'psychic': 2, 'ghost': 2, 'fighting': 0.5, 'dark': 0.5, 'fairy': 0.5},
-        'fairy': {'fighting': 2, 'dragon': 2, 'dark': 2, 'fire': 0.5, 'poison': 0.5, 'steel': 0.5}
-    }
-    return chart.get(attack_type, {}).get(defense_type, 1)
-
 def get_pokemon_data(name):
     try:
         pokemon_url = f"{POKEAPI_BASE}/pokemon/{name}"
         species_url = f"{POKEAPI_BASE}/pokemon-species/{name}"
 
-        poke_res = requests.get(pokemon_url)
-        species_res = requests.get(species_url)
+        poke_data = fetch_json(pokemon_url)
+        species_data = fetch_json(species_url)
 
-        if poke_res.status_code != 200 or species_res.status_code != 200:
+        if poke_data is None or species_data is None:
             return {"error": "Pokemon not found"}
 
-        poke_data = poke_res.json()
-        species_data = species_res.json()
-
         types = [t['type']['name'] for t in poke_data['types']]
         abilities = [a['ability']['name'] for a in poke_data['abilities']]
         stats = {s['stat']['name']: s['base_stat'] for s in poke_data['stats']}
@@ -173,7 +187,7 @@ def simulate_battle(pokemon_1, pokemon_2):
 
             # Random move power
             move_power = random.randint(40, 100)
-            multiplier = get_type_multiplier(atk['type'], defn['type'])
+            multiplier = get_type_multiplier(atk['type'], defn['types'])
 
             # Burn: halve attack
             effective_attack = atk['attack'] // 2 if status[atk['name']] == 'burn' else atk['attack']
@@ -243,10 +257,10 @@ if page == "Pokémon Data":
                 
                 with col1:
                     # Display Pokémon image
-                    try:
-                        st.image(f"https://img.pokemondb.net/artwork/{pokemon_name}.jpg", 
-                                 caption=data['name'].title(), width=200)
-                    except:
+                    artwork = get_artwork(pokemon_name)
+                    if artwork:
+                        st.image(artwork, caption=data['name'].title(), width=200)
+                    else:
                         st.info("Image not available")
                 
                 with col2:
@@ -297,11 +311,9 @@ else:  # Battle Simulator page
         if pokemon1:
             data1 = get_pokemon_data(pokemon1)
             if data1 and "error" not in data1:
-                try:
-                    st.image(f"https://img.pokemondb.net/artwork/{pokemon1}.jpg", 
-                             caption=data1['name'].title(), width=150)
-                except:
-                    pass
+                artwork = get_artwork(pokemon1)
+                if artwork:
+                    st.image(artwork, caption=data1['name'].title(), width=150)
                 
                 # Display types with colored badges
                 types_html = "".join(
@@ -326,11 +338,9 @@ else:  # Battle Simulator page
         if pokemon2:
             data2 = get_pokemon_data(pokemon2)
             if data2 and "error" not in data2:
-                try:
-                    st.image(f"https://img.pokemondb.net/artwork/{pokemon2}.jpg", 
-                             caption=data2['name'].title(), width=150)
-                except:
-                    pass
+                artwork = get_artwork(pokemon2)
+                if artwork:
+                    st.image(artwork, caption=data2['name'].title(), width=150)
                 
                 # Display types with colored badges
                 types_html = "".join(
@@ -0,0 +1,169 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+from app import config, local_store, metrics
+
+# A second cache tier for upstream documents, shared by every worker process
+# (uvicorn --workers N) so PokeAPI is asked once per document per deployment
+# rather than once per worker. Configured with SHARED_CACHE_URL:
+#
+#   sqlite:///data/shared_cache.sqlite3   a file on the local disk (WAL mode)
+#   redis://localhost:6379/0              Redis, or anything that speaks its
+#                                         protocol (needs the redis package)
+#
+# Unset, there is no shared tier. Entries hold compacted documents, encoded
+# like the local store; a 404 is shared as a null document. The in-process
+# caches stay in front of this one, so a worker only asks it on a local miss.
+# Backend failures count as misses and never fail a request. A URL that can't
+# be opened at all is reported once, at startup (see open_backend()).
+
+PREFIX = "pokeapi:"
+# Seconds to wait on the backend before treating a call as a miss.
+TIMEOUT = 1.0
+# Expired SQLite rows are deleted every this many writes.
+PRUNE_EVERY = 1024
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class SQLiteBackend:
+    # Queries run in a worker thread: while another process holds the write
+    # lock they can block for up to TIMEOUT, which must not stall the loop.
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            self._conn = sqlite3.connect(path, timeout=TIMEOUT, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, body BLOB NOT NULL, expires REAL NOT NULL) WITHOUT ROWID"
+            )
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Can't open the shared cache at {path!r}: {e}") from e
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    async def get(self, key):
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key, body, ttl):
+        await asyncio.to_thread(self._set, key, body, ttl)
+
+    def _get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM entries WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def _set(self, key, body, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, body, now + ttl))
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+
+    async def close(self):
+        self._conn.close()
+
+
+class RedisBackend:
+    def __init__(self, url):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("A redis:// SHARED_CACHE_URL needs the redis package (pip install redis)") from e
+        self.url = url
+        self.errors = (redis.RedisError, OSError)
+        self._redis = redis
+        self._client = None
+        self._client_loop = None
+
+    def _get_client(self):
+        # Like the HTTP pool, connections belong to the loop that made them.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = self._redis.from_url(self.url, socket_timeout=TIMEOUT, socket_connect_timeout=TIMEOUT)
+            self._client_loop = loop
+        return self._client
+
+    async def get(self, key):
+        return await self._get_client().get(PREFIX + key)
+
+    async def set(self, key, body, ttl):
+        await self._get_client().set(PREFIX + key, body, px=max(1, int(ttl * 1000)))
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+
+
+def _build(url):
+    parts = urlsplit(url)
+    if parts.scheme == "sqlite":
+        # sqlite:///relative/path or sqlite:////absolute/path
+        return SQLiteBackend(parts.path[1:])
+    if parts.scheme in ("redis", "rediss", "unix"):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported SHARED_CACHE_URL scheme: {parts.scheme!r}")
+
+
+def open_backend():
+    # Called at startup so a SHARED_CACHE_URL that can't be used stops the
+    # server right away, rather than failing every request that misses.
+    get_backend()
+
+
+def get_backend():
+    global _backend
+    if _backend is None and config.SHARED_CACHE_URL:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _build(config.SHARED_CACHE_URL)
+    return _backend
+
+
+async def get(path):
+    # (found, document). found is False on a miss or a backend error; a
+    # shared 404 is (True, None).
+    backend = get_backend()
+    if backend is None:
+        return False, None
+    try:
+        body = await backend.get(path)
+    except backend.errors:
+        metrics.SHARED_CACHE_REQUESTS.labels("get", "error").inc()
+        return False, None
+    if body is None:
+        metrics.SHARED_CACHE_REQUESTS.labels("get", "miss").inc()
+        return False, None
+    metrics.SHARED_CACHE_REQUESTS.labels("get", "hit").inc()
+    return True, local_store.decode(body)
+
+
+async def put(path, doc, ttl):
+    backend = get_backend()
+    if backend is None:
+        return
+    try:
+        await backend.set(path, local_store.encode(doc), ttl)
+    except backend.errors:
+        metrics.SHARED_CACHE_REQUESTS.labels("set", "error").inc()
+    else:
+        metrics.SHARED_CACHE_REQUESTS.labels("set", "ok").inc()
+
+
+async def close():
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
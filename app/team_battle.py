@@ -0,0 +1,263 @@
+import asyncio
+import random
+import time
+from functools import lru_cache
+from app import metrics, profiling
+from app.battle_simulator import (
+    ATTACK, BURN, MAX_ROUNDS, MISSED, PARALYSIS, PARALYZED, POISON, POISONED, STATUS, STATUS_EFFECTS,
+    invalid_names, load_combatant, move_table,
+)
+from app.type_chart import type_multiplier
+
+# Up to TEAM_SIZE vs TEAM_SIZE battles with switching, under the rules of
+# battle_simulator.Battle. Members are numbered 0..n-1 across both teams
+# (team 1 first) and all per-member state lives in flat lists indexed by that
+# number, so a team may field the same species more than once.
+#
+# Team events are (turn, actor, action, value, hp, move, target) tuples: the
+# first six fields mean what they do in 1v1 events, with actor a member
+# number instead of a side; target is the member that took the damage,
+# gained the status or was switched in (actor itself otherwise).
+SWITCH, FAINTED = 5, 6
+
+TEAM_SIZE = 6
+
+# A member switches out voluntarily when it is outmatched at least this badly
+# (see _advantage) and a benched member does at least twice as well.
+SWITCH_BELOW = 0.5
+
+
+@lru_cache(maxsize=4096)
+def _expected_damage(attacker, defender, attacks):
+    # The best per-turn damage the attacker can expect against the defender,
+    # from its move table (accuracy-weighted) or the no-move-data fallback.
+    best = 0.0
+    for _, power, accuracy, physical, multiplier in move_table(attacker, defender):
+        if physical:
+            ratio = attacker.attack / defender.defense
+        else:
+            ratio = attacker.special_attack / defender.special_defense
+        damage = (2 * ratio * power / 50 + 2) * multiplier * (100 if accuracy is None else accuracy) / 100
+        best = max(best, damage)
+    if not attacks:
+        multiplier = type_multiplier(attacker.type_ids[0], defender.type_ids)
+        best = (2 * attacker.attack / defender.defense * 70 / 50 + 2) * multiplier
+    return best
+
+
+def _advantage(p, q):
+    # How much faster p knocks q out than the other way round: > 1 favours p.
+    # Depends only on the two entities, so it is computed once per pair.
+    mine = _expected_damage(p, q, p.attacks) / max(q.hp, 1)
+    theirs = _expected_damage(q, p, q.attacks) / max(p.hp, 1)
+    return mine / theirs if theirs else float("inf")
+
+
+class TeamBattle:
+    # Iterating a TeamBattle plays it out, yielding team event tuples. Like
+    # Battle, the side that moves first alternates every round, starting with
+    # the faster of the two leads. An active member may spend its turn
+    # switching to a better-matched benched member (only after it has acted
+    # once since coming in, so switches can't loop); a fainted member is
+    # replaced at the end of the round by the best-matched member left.
+    __slots__ = (
+        "teams", "members", "size", "rng", "hp", "status", "active", "turns",
+        "tables", "advantage", "settled",
+    )
+
+    def __init__(self, team_1, team_2, rng=random):
+        self.teams = (tuple(team_1), tuple(team_2))
+        members = self.members = self.teams[0] + self.teams[1]
+        self.size = len(self.teams[0])
+        self.rng = rng
+        self.hp = [p.hp for p in members]
+        self.status = [0] * len(members)
+        self.active = [0, self.size]
+        self.settled = [True] * len(members)
+        self.turns = 0
+        # tables[i][j] / advantage[i][j] for members i and j on opposing sides.
+        count = len(members)
+        self.tables = [[None] * count for _ in range(count)]
+        self.advantage = [[None] * count for _ in range(count)]
+        for i in range(count):
+            for j in range(count):
+                if (i < self.size) != (j < self.size):
+                    self.tables[i][j] = move_table(members[i], members[j])
+                    self.advantage[i][j] = _advantage(members[i], members[j])
+
+    def side(self, member):
+        return 0 if member < self.size else 1
+
+    def bench(self, side):
+        # Members of one side that can still fight, active one excluded.
+        first, last = (0, self.size) if side == 0 else (self.size, len(self.members))
+        active = self.active[side]
+        return [i for i in range(first, last) if i != active and self.hp[i] > 0]
+
+    def _best(self, candidates, opponent):
+        # Highest advantage against the opponent; ties go to the lower number.
+        return max(candidates, key=lambda i: (self.advantage[i][opponent], -i))
+
+    def __iter__(self):
+        members, rng, hp, status, active = self.members, self.rng, self.hp, self.status, self.active
+        tables, advantage, settled = self.tables, self.advantage, self.settled
+        remaining = [self.size, len(members) - self.size]
+        first = 0 if members[active[0]].speed >= members[active[1]].speed else 1
+        rounds = 0
+        max_rounds = MAX_ROUNDS * max(remaining)
+
+        while remaining[0] and remaining[1] and rounds < max_rounds:
+            rounds += 1
+            for s in (first, 1 - first):
+                a, d = active[s], active[1 - s]
+                if hp[a] <= 0 or hp[d] <= 0:
+                    break
+                self.turns += 1
+
+                if settled[a] and advantage[a][d] < SWITCH_BELOW:
+                    bench = self.bench(s)
+                    if bench:
+                        best = self._best(bench, d)
+                        if advantage[best][d] >= 2 * advantage[a][d]:
+                            active[s] = best
+                            settled[best] = False
+                            yield (self.turns, a, SWITCH, 0, hp[best], None, best)
+                            continue
+                settled[a] = True
+
+                atk, defn = members[a], members[d]
+                if status[a] == PARALYSIS and rng.random() < 0.25:
+                    yield (self.turns, a, PARALYZED, 0, hp[a], None, a)
+                    continue
+
+                table = tables[a][d]
+                if table:
+                    name, move_power, accuracy, physical, multiplier = rng.choice(table)
+                    if accuracy is not None and rng.random() * 100 >= accuracy:
+                        yield (self.turns, a, MISSED, 0, hp[d], name, d)
+                        continue
+                    if physical:
+                        effective_attack, defense = atk.attack, defn.defense
+                    else:
+                        effective_attack, defense = atk.special_attack, defn.special_defense
+                else:
+                    name, physical = None, True
+                    move_power = rng.randint(40, 100)
+                    multiplier = type_multiplier(atk.type_ids[0], defn.type_ids)
+                    effective_attack, defense = atk.attack, defn.defense
+
+                if physical and status[a] == BURN:
+                    effective_attack //= 2
+
+                damage = int((((2 * effective_attack / defense) * move_power) / 50 + 2) * multiplier)
+                hp[d] -= damage
+                yield (self.turns, a, ATTACK, damage, hp[d], name, d)
+
+                if status[d] == POISON:
+                    poison_dmg = int(hp[d] * 0.05)
+                    hp[d] -= poison_dmg
+                    yield (self.turns, d, POISONED, poison_dmg, hp[d], None, d)
+
+                if status[d] == 0 and rng.random() < 0.2:
+                    status[d] = rng.choice((PARALYSIS, BURN, POISON))
+                    yield (self.turns, d, STATUS, status[d], hp[d], None, d)
+
+            for s in (0, 1):
+                fainted = active[s]
+                if hp[fainted] > 0:
+                    continue
+                remaining[s] -= 1
+                yield (self.turns, fainted, FAINTED, 0, hp[fainted], None, fainted)
+                bench = self.bench(s)
+                if bench:
+                    best = self._best(bench, active[1 - s])
+                    active[s] = best
+                    settled[best] = True
+                    yield (self.turns, fainted, SWITCH, 1, hp[best], None, best)
+
+            first = 1 - first
+
+    @property
+    def names(self):
+        return [p.name for p in self.members]
+
+    @property
+    def winner(self):
+        for s in (0, 1):
+            if not self.bench(1 - s) and self.hp[self.active[1 - s]] <= 0:
+                return f"team_{s + 1}"
+        return None
+
+    def team_report(self, side):
+        first, last = (0, self.size) if side == 0 else (self.size, len(self.members))
+        return [
+            {
+                "name": self.members[i].name,
+                "hp": max(self.hp[i], 0),
+                "status": STATUS_EFFECTS[self.status[i] - 1] if self.status[i] else None,
+            }
+            for i in range(first, last)
+        ]
+
+
+def render_team_event(event, battle):
+    _, actor, action, value, hp, move, target = event
+    names = battle.names
+
+    def label(i):
+        return f"{names[i]} (team {battle.side(i) + 1})"
+
+    if action == ATTACK:
+        used = f"used {move}" if move else "used a move"
+        return f"{label(actor)} {used} and dealt {value} damage to {label(target)} ({hp} HP left)"
+    if action == MISSED:
+        return f"{label(actor)} used {move} but it missed!"
+    if action == PARALYZED:
+        return f"{label(actor)} is paralyzed and can’t move!"
+    if action == POISONED:
+        return f"{label(actor)} took {value} poison damage! ({hp} HP left)"
+    if action == STATUS:
+        return f"{label(actor)} is now affected by {STATUS_EFFECTS[value - 1]}!"
+    if action == FAINTED:
+        return f"{label(actor)} fainted!"
+    if value:
+        return f"Team {battle.side(target) + 1} sent out {names[target]}!"
+    return f"Team {battle.side(actor) + 1} switched {names[actor]} out for {names[target]}!"
+
+
+def run_team_battle(team_1, team_2, rng=random, log="text"):
+    with profiling.phase("battle"):
+        start = time.perf_counter()
+        battle = TeamBattle(team_1, team_2, rng)
+        if log == "text":
+            details = {"battle_log": [render_team_event(e, battle) for e in battle]}
+        elif log == "events":
+            details = {"members": battle.names, "events": list(battle)}
+        else:
+            details = {}
+            for _ in battle:
+                pass
+        metrics.observe_battle("team", battle.turns, time.perf_counter() - start)
+    return {
+        "winner": battle.winner,
+        **details,
+        "team_1": battle.team_report(0),
+        "team_2": battle.team_report(1),
+        "turns": battle.turns,
+    }
+
+
+async def fetch_teams(team_1, team_2):
+    # Every distinct member of both teams is loaded in one concurrent batch.
+    # Returns the two teams as entity lists, with None for unknown names.
+    unique = list(dict.fromkeys(team_1 + team_2))
+    loaded = dict(zip(unique, await asyncio.gather(*(load_combatant(name) for name in unique))))
+    return [loaded[name] for name in team_1], [loaded[name] for name in team_2]
+
+
+async def simulate_team_battle(team_1, team_2, log="text"):
+    members_1, members_2 = await fetch_teams(team_1, team_2)
+    if None in members_1 or None in members_2:
+        unknown = [name for name, p in zip(team_1 + team_2, members_1 + members_2) if p is None]
+        return await invalid_names(*dict.fromkeys(unknown))
+    return run_team_battle(members_1, members_2, log=log)
@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from app import config, http_client
+from app.pokeapi import UpstreamError, fetch_attacks, fetch_pokemon, load_move_catalog
+from app.monte_carlo import simulate_many
+
+# Output files for --out PREFIX:
+#   PREFIX.npy          float32 N x N matrix, [i, j] = P(roster[i] beats roster[j]),
+#                       NaN until the pair has been simulated
+#   PREFIX.blocks.npy   uint8 grid of finished pair blocks, used to resume
+#   PREFIX.roster.json  roster, loaded stats and run parameters
+
+
+def _paths(prefix):
+    return f"{prefix}.npy", f"{prefix}.blocks.npy", f"{prefix}.roster.json"
+
+
+async def load_roster_stats(names, concurrency):
+    # A roster usually covers most of the move catalog, so it is loaded up
+    # front in one pass rather than learnset by learnset. A member whose
+    # learnset still fails to load is returned with attacks None.
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load(name):
+        async with semaphore:
+            pokemon = await fetch_pokemon(name)
+            if pokemon is not None:
+                try:
+                    await fetch_attacks(pokemon)
+                except UpstreamError:
+                    pass
+            return pokemon
+
+    try:
+        await load_move_catalog()
+        return await asyncio.gather(*(load(name) for name in names))
+    finally:
+        await http_client.close()
+
+
+# The roster's entities in a worker process, sent once per worker by the
+# pool initializer rather than with every block.
+_stats = None
+
+
+def _init_worker(stats):
+    global _stats
+    _stats = stats
+
+
+def _run_block(matrix_path, rows, cols, battles, seed):
+    # Runs in a worker process; each pair writes only its own two cells of
+    # the shared memory-mapped matrix.
+    matrix = np.load(matrix_path, mmap_mode="r+")
+    stats = _stats
+    for i in rows:
+        for j in cols:
+            if j <= i:
+                continue
+            winner, _ = simulate_many(stats[i], stats[j], battles, seed=[seed, i, j])
+            counts = np.bincount(winner, minlength=3)
+            matrix[i, j] = counts[1] / battles
+            matrix[j, i] = counts[2] / battles
+    matrix.flush()
+
+
+def _open_run(prefix, roster, stats, params, resume):
+    matrix_path, blocks_path, meta_path = _paths(prefix)
+    n = len(roster)
+    n_blocks = -(-n // params["block"])
+    if resume and os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["roster"] != roster or meta["params"] != params:
+            raise SystemExit(f"{meta_path} was written for a different roster or parameters; pass --fresh to start over")
+        return matrix_path, np.load(blocks_path, mmap_mode="r+")
+
+    os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+    matrix = np.lib.format.open_memmap(matrix_path, mode="w+", dtype=np.float32, shape=(n, n))
+    matrix[:] = np.nan
+    matrix.flush()
+    del matrix
+    done = np.lib.format.open_memmap(blocks_path, mode="w+", dtype=np.uint8, shape=(n_blocks, n_blocks))
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"roster": roster, "stats": [s.summary() for s in stats], "params": params}, f)
+    return matrix_path, done
+
+
+def run_tournament(roster, prefix, battles=1000, block=16, workers=None, seed=0, resume=True):
+    stats = asyncio.run(load_roster_stats(roster, config.BATCH_CONCURRENCY))
+    missing = [name for name, s in zip(roster, stats) if s is None]
+    if missing:
+        raise SystemExit(f"Unknown Pokémon: {', '.join(missing)}")
+    # Running these on the no-move-data fallback would mix two damage models
+    # in one matrix, undetectably on resume.
+    incomplete = [name for name, s in zip(roster, stats) if s.attacks is None]
+    if incomplete:
+        raise SystemExit(f"Couldn't load the learnsets of: {', '.join(incomplete)}; try again later")
+
+    params = {"battles": battles, "block": block, "seed": seed}
+    matrix_path, done = _open_run(prefix, roster, stats, params, resume)
+    n = len(roster)
+    pending = [
+        (bi, bj)
+        for bi in range(done.shape[0])
+        for bj in range(bi, done.shape[1])
+        if not done[bi, bj]
+    ]
+    print(f"{n} species, {len(pending)} of {done.shape[0] * (done.shape[0] + 1) // 2} blocks to run")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(stats,)) as pool:
+        futures = {
+            pool.submit(
+                _run_block,
+                matrix_path,
+                range(bi * block, min(n, (bi + 1) * block)),
+                range(bj * block, min(n, (bj + 1) * block)),
+                battles,
+                seed,
+            ): (bi, bj)
+            for bi, bj in pending
+        }
+        for finished, future in enumerate(as_completed(futures), 1):
+            future.result()
+            done[futures[future]] = 1
+            done.flush()
+            print(f"\r{finished}/{len(pending)} blocks", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    return np.load(matrix_path, mmap_mode="r")
+
+
+def ranking(roster, matrix):
+    strength = np.nanmean(np.asarray(matrix, dtype=np.float64), axis=1)
+    order = np.argsort(-strength, kind="stable")
+    return [(roster[i], float(strength[i])) for i in order]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.tournament",
+        description="Simulate every pair in a roster and write the win-rate matrix.",
+    )
+    parser.add_argument("roster", help="text file with one Pokémon name per line")
+    parser.add_argument("--out", required=True, help="output prefix, e.g. results/gen1")
+    parser.add_argument("--battles", type=int, default=1000, help="battles per pair")
+    parser.add_argument("--block", type=int, default=16, help="species per block edge")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fresh", action="store_true", help="discard any partial run at --out")
+    parser.add_argument("--top", type=int, default=10, help="print the N strongest species")
+    args = parser.parse_args(argv)
+
+    with open(args.roster, encoding="utf-8") as f:
+        roster = list(dict.fromkeys(line.strip().lower() for line in f if line.strip()))
+
+    matrix = run_tournament(
+        roster, args.out, args.battles, args.block, args.workers, args.seed, not args.fresh
+    )
+    for rank, (name, strength) in enumerate(ranking(roster, matrix)[:args.top], 1):
+        print(f"{rank:>4}. {name:<24} {strength:.3f}")
+
+
+if __name__ == "__main__":
+    main()
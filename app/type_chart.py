@@ -0,0 +1,84 @@
+from functools import lru_cache
+
+# Type ids follow PokeAPI's numbering (minus one). NO_TYPE pads the second
+# slot of single-typed Pokémon so every defender is a (type, type) pair.
+TYPES = (
+    "normal", "fighting", "flying", "poison", "ground", "rock",
+    "bug", "ghost", "steel", "fire", "water", "grass",
+    "electric", "psychic", "ice", "dragon", "dark", "fairy",
+)
+TYPE_IDS = {name: i for i, name in enumerate(TYPES)}
+NO_TYPE = len(TYPES)
+
+_RELATIONS = {
+    # attacking type: (super effective against, not very effective against, no effect on)
+    "normal": ((), ("rock", "steel"), ("ghost",)),
+    "fighting": (("normal", "ice", "rock", "dark", "steel"), ("poison", "flying", "psychic", "bug", "fairy"), ("ghost",)),
+    "flying": (("grass", "fighting", "bug"), ("electric", "rock", "steel"), ()),
+    "poison": (("grass", "fairy"), ("poison", "ground", "rock", "ghost"), ("steel",)),
+    "ground": (("fire", "electric", "poison", "rock", "steel"), ("grass", "bug"), ("flying",)),
+    "rock": (("fire", "ice", "flying", "bug"), ("fighting", "ground", "steel"), ()),
+    "bug": (("grass", "psychic", "dark"), ("fire", "fighting", "poison", "flying", "ghost", "steel", "fairy"), ()),
+    "ghost": (("psychic", "ghost"), ("dark",), ("normal",)),
+    "steel": (("ice", "rock", "fairy"), ("fire", "water", "electric", "steel"), ()),
+    "fire": (("grass", "ice", "bug", "steel"), ("fire", "water", "rock", "dragon"), ()),
+    "water": (("fire", "ground", "rock"), ("water", "grass", "dragon"), ()),
+    "grass": (("water", "ground", "rock"), ("fire", "grass", "poison", "flying", "bug", "dragon", "steel"), ()),
+    "electric": (("water", "flying"), ("electric", "grass", "dragon"), ("ground",)),
+    "psychic": (("fighting", "poison"), ("psychic", "steel"), ("dark",)),
+    "ice": (("grass", "ground", "flying", "dragon"), ("fire", "water", "ice", "steel"), ()),
+    "dragon": (("dragon",), ("steel",), ("fairy",)),
+    "dark": (("psychic", "ghost"), ("fighting", "dark", "fairy"), ()),
+    "fairy": (("fighting", "dragon", "dark"), ("fire", "poison", "steel"), ()),
+}
+
+
+def _build_chart():
+    size = NO_TYPE + 1
+    chart = [[1.0] * size for _ in range(size)]
+    for attack, (double, half, immune) in _RELATIONS.items():
+        row = chart[TYPE_IDS[attack]]
+        for factor, defenders in ((2.0, double), (0.5, half), (0.0, immune)):
+            for defense in defenders:
+                row[TYPE_IDS[defense]] = factor
+    return tuple(tuple(row) for row in chart)
+
+
+# EFFECTIVENESS[attack_id][defense_id]; row and column NO_TYPE are all 1.0.
+EFFECTIVENESS = _build_chart()
+
+
+def type_ids(names):
+    # Up to two known type ids for a Pokémon, padded with NO_TYPE.
+    ids = [TYPE_IDS[n] for n in names if n in TYPE_IDS][:2]
+    ids += [NO_TYPE] * (2 - len(ids))
+    return tuple(ids)
+
+
+def type_multiplier(attack_id, defense_ids):
+    row = EFFECTIVENESS[attack_id]
+    return row[defense_ids[0]] * row[defense_ids[1]]
+
+
+def get_type_multiplier(attack_type, defense_types):
+    if isinstance(defense_types, str):
+        defense_types = (defense_types,)
+    attack_id = TYPE_IDS.get(attack_type, NO_TYPE)
+    return type_multiplier(attack_id, type_ids(defense_types))
+
+
+@lru_cache(maxsize=None)
+def effectiveness_array():
+    import numpy as np
+    chart = np.array(EFFECTIVENESS, dtype=np.float64)
+    chart.setflags(write=False)
+    return chart
+
+
+def batch_multipliers(attack_ids, defense_ids):
+    # attack_ids: shape (n,); defense_ids: shape (n, 2), padded with NO_TYPE.
+    import numpy as np
+    chart = effectiveness_array()
+    attack_ids = np.asarray(attack_ids)
+    defense_ids = np.asarray(defense_ids)
+    return chart[attack_ids, defense_ids[..., 0]] * chart[attack_ids, defense_ids[..., 1]]
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import time
+from app import config, local_store, name_index, pokeapi, shared_cache
+from app.data_resource import get_pokemon_data
+
+# Background warm-up started by the FastAPI lifespan. The server answers
+# requests right away; meanwhile this builds the name index, imports the
+# NumPy battle engine, and loads the warm set (Pokémon, evolution chain and
+# learnset moves for each species) through the normal cache tiers, so it
+# costs no PokeAPI calls when a local store or shared cache already has the
+# documents. The warm set is the species recorded in WARMUP_SNAPSHOT at the
+# last shutdown, most recently used first, or POPULAR if there is none.
+#
+# The whole move catalog is loaded before the warm set when a local store or
+# shared cache can serve it. Fetched from PokeAPI instead it is ~940 calls
+# per worker, so it only runs when WARMUP_MOVES asks for it, and then after
+# the worker reports ready.
+
+POPULAR = (
+    "pikachu", "charizard", "mewtwo", "eevee", "gengar", "lucario", "bulbasaur", "charmander",
+    "squirtle", "snorlax", "dragonite", "gyarados", "greninja", "blastoise", "venusaur", "mew",
+    "umbreon", "garchomp", "rayquaza", "arcanine", "jigglypuff", "psyduck", "meowth", "lapras",
+    "sylveon", "tyranitar", "scizor", "alakazam", "machamp", "gardevoir", "blaziken", "infernape",
+    "lugia", "ho-oh", "metagross", "salamence", "vaporeon", "jolteon", "flareon", "espeon",
+    "ninetales", "onix", "magikarp", "togepi", "ditto", "mimikyu", "zoroark", "absol", "ampharos", "dragapult",
+)
+
+progress = {
+    "state": "pending",
+    "species_total": 0,
+    "species_done": 0,
+    "species_failed": 0,
+    "name_index": False,
+    "moves_state": "pending",
+    "moves": 0,
+    "moves_failed": 0,
+    "engines": False,
+    "seconds": None,
+}
+
+_task = None
+
+
+def warm_set():
+    try:
+        with open(config.WARMUP_SNAPSHOT, encoding="utf-8") as f:
+            species = json.load(f)["species"]
+    except (OSError, ValueError, KeyError):
+        species = POPULAR
+    return list(dict.fromkeys(species))[:config.WARMUP_SPECIES]
+
+
+def save_snapshot():
+    # The species this worker served most recently become the next warm set.
+    # Written via a temporary file, since several workers may stop at once.
+    species = pokeapi.entities.keys()[::-1][:config.WARMUP_SPECIES]
+    if not species:
+        return
+    tmp = f"{config.WARMUP_SNAPSHOT}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(config.WARMUP_SNAPSHOT) or ".", exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"species": species}, f)
+        os.replace(tmp, config.WARMUP_SNAPSHOT)
+    except OSError:
+        pass
+
+
+def _import_engines():
+    # NumPy and the vectorized engine are only imported when first needed;
+    # do it here, off the event loop, so the first battle-odds call doesn't.
+    from app import monte_carlo  # noqa: F401
+
+
+async def _warm_species(name, semaphore):
+    # Warm-up shares PokeAPI with live traffic, so each species is loaded with
+    # little fan-out: at most two documents at once, then any learnset moves
+    # the catalog lacks one at a time. A species only counts as done once its
+    # learnset is resolved too.
+    async with semaphore:
+        try:
+            data = await get_pokemon_data(name)
+            pokemon = pokeapi.entities.get(data.get("name"))
+            if pokemon is not None:
+                await pokeapi.fetch_attacks(pokemon, concurrency=1)
+            warmed = pokemon is not None and pokemon.attacks is not None
+        except Exception:
+            warmed = False
+    progress["species_done" if warmed else "species_failed"] += 1
+
+
+def _catalog_mode():
+    # "first" (before the warm set), "background" (after ready) or None.
+    local = (
+        config.DATA_SOURCE != "live" and local_store.get_store() is not None
+        or shared_cache.get_backend() is not None
+    )
+    enabled = local if config.WARMUP_MOVES is None else config.WARMUP_MOVES
+    if not enabled:
+        return None
+    return "first" if local else "background"
+
+
+async def _load_moves():
+    progress["moves_state"] = "running"
+    try:
+        progress["moves"], progress["moves_failed"] = await pokeapi.load_move_catalog(config.WARMUP_CONCURRENCY)
+    except Exception as e:
+        progress.update(moves_state="failed", moves_error=repr(e))
+    else:
+        progress["moves_state"] = "done"
+
+
+async def _engines():
+    await asyncio.to_thread(_import_engines)
+    progress["engines"] = True
+
+
+async def run():
+    start = time.perf_counter()
+    species = warm_set()
+    progress.update(state="running", species_total=len(species))
+    catalog = _catalog_mode()
+    if catalog is None:
+        progress["moves_state"] = "skipped"
+    try:
+        engines = asyncio.ensure_future(_engines())
+        progress["name_index"] = await name_index.get_index() is not None
+        if catalog == "first":
+            # The catalog first, so the species below find their moves cached.
+            await _load_moves()
+        semaphore = asyncio.Semaphore(config.WARMUP_CONCURRENCY)
+        await asyncio.gather(*(_warm_species(name, semaphore) for name in species))
+        await engines
+    except asyncio.CancelledError:
+        progress["state"] = "cancelled"
+        raise
+    except Exception as e:
+        # Warm-up is best effort; the server works without it.
+        progress.update(state="failed", error=repr(e))
+    else:
+        progress["state"] = "done"
+    finally:
+        progress["seconds"] = round(time.perf_counter() - start, 3)
+    if catalog == "background":
+        await _load_moves()
+
+
+def start():
+    global _task
+    _task = asyncio.ensure_future(run())
+    return _task
+
+
+def ready():
+    # Ready once warm-up has finished, whether or not all of it worked.
+    return progress["state"] in ("done", "failed")
+
+
+def stop():
+    if _task is not None:
+        _task.cancel()
+    save_snapshot()
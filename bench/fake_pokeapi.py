@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# A stand-in for https://pokeapi.co/api/v2 that serves recorded documents
+# from a fixture directory laid out like the API (fixtures/pokemon/pikachu.json,
+# fixtures/evolution-chain/1.json, ...), with optional injected latency.
+# The same layout is accepted by `python -m app.importer --dump`.
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+API_PREFIX = "/api/v2/"
+
+
+class FakePokeAPI(ThreadingHTTPServer):
+    daemon_threads = True
+    # The stdlib default backlog of 5 drops concurrent connects into SYN
+    # retries, which would show up as one-second outliers.
+    request_queue_size = 1024
+
+    def __init__(self, address, fixtures=FIXTURES, latency=0.0):
+        super().__init__(address, _Handler)
+        self.fixtures = fixtures
+        self.latency = latency
+        # Set to an HTTP status (e.g. 503) to answer every request with it,
+        # for outage drills.
+        self.outage = None
+        # Set to a number to answer 429, like a rate-limiting upstream, while
+        # more than that many requests are being served at once.
+        self.max_concurrent = None
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.throttled = 0
+        self._documents = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v2"
+
+    def document(self, path):
+        with self._lock:
+            if path not in self._documents:
+                self._documents[path] = self._read(path)
+            return self._documents[path]
+
+    def _read(self, path):
+        kind, _, key = path.partition("/")
+        kind_dir = os.path.join(self.fixtures, kind)
+        if not os.path.isdir(kind_dir) or "/" in key or key.startswith("."):
+            return None
+        if not key:
+            # Listing endpoint, e.g. /pokemon?limit=100000
+            names = sorted(f[:-5] for f in os.listdir(kind_dir) if f.endswith(".json"))
+            body = {
+                "count": len(names),
+                "next": None,
+                "previous": None,
+                "results": [{"name": n, "url": f"{self.base_url}/{kind}/{n}/"} for n in names],
+            }
+            return json.dumps(body).encode()
+        file_path = os.path.join(kind_dir, key + ".json")
+        if not os.path.exists(file_path):
+            file_path = self._find_by_id(kind_dir, key)
+        if file_path is None:
+            return None
+        with open(file_path, "rb") as f:
+            return f.read()
+
+    def _find_by_id(self, kind_dir, key):
+        if not key.isdigit():
+            return None
+        for filename in os.listdir(kind_dir):
+            file_path = os.path.join(kind_dir, filename)
+            with open(file_path, encoding="utf-8") as f:
+                if json.load(f).get("id") == int(key):
+                    return file_path
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, delayed ACKs
+    # would hold back the body of every keep-alive response by ~40 ms.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server._lock:
+            server.requests += 1
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            throttled = server.max_concurrent is not None and server.active > server.max_concurrent
+            if throttled:
+                server.throttled += 1
+        try:
+            self._respond(server, throttled)
+        finally:
+            with server._lock:
+                server.active -= 1
+
+    def _respond(self, server, throttled):
+        if server.latency:
+            time.sleep(server.latency)
+
+        path = urlsplit(self.path).path
+        body = None
+        if server.outage or throttled:
+            self.send_response(429 if throttled else server.outage)
+            body = b"Too Many Requests" if throttled else b"Outage drill"
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if path.startswith(API_PREFIX):
+            body = server.document(path[len(API_PREFIX):].strip("/"))
+
+        if body is None:
+            self.send_response(404)
+            body = b"Not Found"
+            self.send_header("Content-Type", "text/plain")
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port=0, fixtures=FIXTURES, latency=0.0):
+    # Serves in a background thread; returns the server (see .base_url).
+    server = FakePokeAPI(("127.0.0.1", port), fixtures, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.fake_pokeapi")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every response")
+    parser.add_argument("--max-concurrent", type=int, help="answer 429 above this many concurrent requests")
+    args = parser.parse_args(argv)
+    server = FakePokeAPI(("127.0.0.1", args.port), args.fixtures, args.latency_ms / 1000)
+    server.max_concurrent = args.max_concurrent
+    print(f"Serving {args.fixtures} at {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import socketserver
+import threading
+import time
+
+# An in-memory stand-in for Redis that speaks just enough of its protocol
+# (RESP2, or RESP3 after HELLO 3) for the shared cache: GET, SET with EX/PX,
+# DEL, DBSIZE, FLUSHDB, PING. Lets SHARED_CACHE_URL=redis://... be exercised
+# without a Redis server.
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _Handler)
+        self.data = {}
+        self.commands = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def execute(self, args):
+        name = args[0].upper()
+        with self._lock:
+            self.commands += 1
+            now = time.monotonic()
+            if name == b"GET":
+                entry = self.data.get(args[1])
+                if entry is None or entry[1] <= now:
+                    self.data.pop(args[1], None)
+                    return None
+                return entry[0]
+            if name == b"SET":
+                expires = float("inf")
+                options = [a.upper() for a in args[3:]]
+                if b"EX" in options:
+                    expires = now + int(args[3 + options.index(b"EX") + 1])
+                elif b"PX" in options:
+                    expires = now + int(args[3 + options.index(b"PX") + 1]) / 1000
+                self.data[args[1]] = (args[2], expires)
+                return "OK"
+            if name == b"DEL":
+                return sum(self.data.pop(key, None) is not None for key in args[1:])
+            if name == b"DBSIZE":
+                return len(self.data)
+            if name == b"FLUSHDB":
+                self.data.clear()
+                return "OK"
+            if name == b"PING":
+                return "PONG"
+            if name == b"HELLO":
+                return {"server": "fake-redis", "version": "7.0.0", "proto": int(args[1]) if len(args) > 1 else 2}
+            if name in (b"CLIENT", b"SELECT"):
+                return "OK"
+        return ValueError(f"unknown command '{name.decode()}'")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        resp3 = False
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            reply = self.server.execute(args)
+            if isinstance(reply, dict):
+                resp3 = reply["proto"] == 3
+            self.wfile.write(_encode(reply, resp3))
+            self.wfile.flush()
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command, e.g. from telnet.
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+
+def _encode(value, resp3=False):
+    if value is None:
+        return b"_\r\n" if resp3 else b"$-1\r\n"
+    if isinstance(value, dict):
+        items = [x for pair in value.items() for x in pair]
+        head = b"%%%d\r\n" % len(value) if resp3 else b"*%d\r\n" % len(items)
+        return head + b"".join(_encode(x if isinstance(x, int) else x.encode(), resp3) for x in items)
+    if isinstance(value, Exception):
+        return f"-ERR {value}\r\n".encode()
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, str):
+        return f"+{value}\r\n".encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def start(port=0):
+    # Serves in a background thread; returns the server (see .url).
+    server = FakeRedis(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.fake_redis")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args(argv)
+    server = FakeRedis(("127.0.0.1", args.port))
+    print(f"Serving at {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from bench import fake_pokeapi
+
+# Usage: python -m bench.run [--latency-ms 50] [--out bench_results.json]
+# Starts the fake PokeAPI, points the app at it and writes one JSON report
+# so runs can be diffed against each other. Exits non-zero if the scalar and
+# vectorized battle engines disagree (see check_engine_parity).
+
+# Largest win-probability gap allowed between the two engines on one
+# matchup, and the largest relative gap in mean turns. Both runs are seeded,
+# so the check is deterministic; at the default 5000 battles per engine the
+# sampling error of the win-rate gap is about 0.01.
+PARITY_WIN_TOLERANCE = 0.05
+PARITY_TURNS_TOLERANCE = 0.05
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(p / 100 * len(samples)))]
+
+    return {
+        "n": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "p50_ms": round(pct(50) * 1000, 4),
+        "p90_ms": round(pct(90) * 1000, 4),
+        "p99_ms": round(pct(99) * 1000, 4),
+        "max_ms": round(samples[-1] * 1000, 4),
+    }
+
+
+def _species():
+    return sorted(
+        f[:-5] for f in os.listdir(os.path.join(fake_pokeapi.FIXTURES, "pokemon")) if f.endswith(".json")
+    )
+
+
+def _reset_caches():
+    from app import pokeapi
+    for cache in (pokeapi.cache, pokeapi.entities, pokeapi.chains, pokeapi.species_chains, pokeapi.moves):
+        cache.clear()
+
+
+async def bench_resource(server, species, repeats):
+    from app.data_resource import get_pokemon_data
+
+    cold, warm = [], []
+    before = server.requests
+    for name in species:
+        _reset_caches()
+        start = time.perf_counter()
+        await get_pokemon_data(name)
+        cold.append(time.perf_counter() - start)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            await get_pokemon_data(name)
+            warm.append(time.perf_counter() - start)
+    return {
+        "cold": _summary(cold),
+        "warm": _summary(warm),
+        "upstream_requests": server.requests - before,
+    }
+
+
+async def bench_battle_engine(species, seconds):
+    from app.battle_simulator import fetch_combatants, run_battle
+    from app.monte_carlo import battle_odds
+
+    p1, p2 = await fetch_combatants(species[0], species[1])
+    results = {"matchup": [p1.name, p2.name]}
+    for log in ("none", "events", "text"):
+        rng = random.Random(0)
+        count, turns = 0, 0
+        deadline = time.perf_counter() + seconds
+        start = time.perf_counter()
+        while time.perf_counter() < deadline:
+            result = run_battle(p1, p2, rng, log)
+            count += 1
+            turns += result["turns"]
+        elapsed = time.perf_counter() - start
+        results[f"scalar_log_{log}"] = {
+            "battles_per_sec": round(count / elapsed, 1),
+            "turns_per_sec": round(turns / elapsed, 1),
+        }
+
+    from app.team_battle import TeamBattle, fetch_teams
+
+    team_1, team_2 = await fetch_teams(species[:6], species[6:12])
+    rng = random.Random(0)
+    count, turns = 0, 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        battle = TeamBattle(team_1, team_2, rng)
+        for _ in battle:
+            pass
+        count += 1
+        turns += battle.turns
+    elapsed = time.perf_counter() - start
+    results["team_6v6"] = {
+        "battles_per_sec": round(count / elapsed, 1),
+        "turns_per_sec": round(turns / elapsed, 1),
+    }
+
+    timings = []
+    for seed in range(5):
+        start = time.perf_counter()
+        battle_odds(p1, p2, 10000, seed)
+        timings.append(time.perf_counter() - start)
+    results["vectorized_10k_battles"] = _summary(timings)
+    return results
+
+
+async def check_engine_parity(species, battles):
+    # The vectorized engine must play by the scalar engine's rules: on every
+    # fixture matchup, seeded runs of both must agree on the win
+    # probabilities and the mean battle length.
+    from app.battle_simulator import fetch_combatants, run_battle
+    from app.monte_carlo import simulate_many
+
+    matchups = []
+    worst_win, worst_turns = 0.0, 0.0
+    for i in range(len(species)):
+        j = (i * 7 + 3) % len(species)
+        if i == j:
+            continue
+        p1, p2 = await fetch_combatants(species[i], species[j])
+        rng = random.Random(i)
+        scalar_wins, scalar_turns = [0, 0, 0], 0
+        for _ in range(battles):
+            result = run_battle(p1, p2, rng, log="none")
+            scalar_wins[{"pokemon_1": 1, "pokemon_2": 2, None: 0}[result["winner_slot"]]] += 1
+            scalar_turns += result["turns"]
+        winner, turns = simulate_many(p1, p2, battles, seed=i)
+        vector_wins = [int((winner == side).sum()) for side in (0, 1, 2)]
+        win_gap = max(abs(a - b) / battles for a, b in zip(scalar_wins, vector_wins))
+        turns_gap = abs(scalar_turns / battles - float(turns.mean())) / (scalar_turns / battles)
+        worst_win, worst_turns = max(worst_win, win_gap), max(worst_turns, turns_gap)
+        matchups.append({
+            "matchup": [p1.name, p2.name],
+            "scalar_p1_win": scalar_wins[1] / battles,
+            "vectorized_p1_win": vector_wins[1] / battles,
+            "win_gap": round(win_gap, 4),
+            "turns_gap": round(turns_gap, 4),
+        })
+    return {
+        "battles_per_engine": battles,
+        "max_win_gap": round(worst_win, 4),
+        "max_turns_gap": round(worst_turns, 4),
+        "ok": worst_win <= PARITY_WIN_TOLERANCE and worst_turns <= PARITY_TURNS_TOLERANCE,
+        "matchups": matchups,
+    }
+
+
+async def bench_endpoints(species, requests, concurrency):
+    import httpx
+    from app.main import app
+
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def timed(method, url, params):
+            async with semaphore:
+                start = time.perf_counter()
+                res = await client.request(method, url, params=params)
+                elapsed = time.perf_counter() - start
+            return elapsed, res.status_code
+
+        cases = {
+            "resource_pokemon": lambda i: ("GET", "/resource/pokemon", {"name": species[i % len(species)]}),
+            "simulate_battle": lambda i: ("POST", "/tool/simulate_battle", {
+                "pokemon_1": species[i % len(species)],
+                "pokemon_2": species[(i * 7 + 3) % len(species)],
+            }),
+        }
+        for case, make in cases.items():
+            for phase in ("cold", "warm"):
+                if phase == "cold":
+                    _reset_caches()
+                start = time.perf_counter()
+                timings = await asyncio.gather(*(timed(*make(i)) for i in range(requests)))
+                wall = time.perf_counter() - start
+                summary = _summary([t for t, _ in timings])
+                summary["requests_per_sec"] = round(requests / wall, 1)
+                summary["errors"] = sum(1 for _, status in timings if status != 200)
+                results[f"{case}_{phase}"] = summary
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args, server):
+    from app import http_client, name_index
+
+    species = _species()
+    try:
+        # Built once at server startup; keep it out of the cold lookups.
+        await name_index.get_index()
+        return {
+            "resource_lookup": await bench_resource(server, species, args.repeats),
+            "battle_engine": await bench_battle_engine(species, args.seconds),
+            "engine_parity": await check_engine_parity(species, args.parity_battles),
+            "endpoints": await bench_endpoints(species, args.requests, args.concurrency),
+        }
+    finally:
+        await http_client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.run")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="latency injected by the fake PokeAPI")
+    parser.add_argument("--repeats", type=int, default=50, help="warm lookups per species")
+    parser.add_argument("--seconds", type=float, default=1.0, help="duration of each battle-engine run")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint phase")
+    parser.add_argument("--concurrency", type=int, default=20, help="in-flight endpoint requests")
+    parser.add_argument("--parity-battles", type=int, default=5000, help="battles per engine per parity matchup")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    server = fake_pokeapi.start(latency=args.latency_ms / 1000)
+    # app.config reads the environment at import time, so configure it
+    # before anything from app is imported.
+    os.environ["POKEAPI_BASE"] = server.base_url
+    os.environ["DATA_SOURCE"] = "live"
+    # Every benchmark request comes from one client; don't rate-limit it.
+    os.environ["CLIENT_RATE"] = "0"
+
+    results = asyncio.run(run(args, server))
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "config": vars(args),
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+    print(f"Wrote {args.out}")
+    parity = results["engine_parity"]
+    if not parity["ok"]:
+        raise SystemExit(
+            f"Engine parity check failed: win-probability gap {parity['max_win_gap']}, "
+            f"mean-turns gap {parity['max_turns_gap']}"
+        )
+
+
+if __name__ == "__main__":
+    main()